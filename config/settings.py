@@ -5,6 +5,8 @@ Django settings for Stripe Payment Service
 from pathlib import Path
 from decouple import config, Csv
 import dj_database_url
+import django
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -26,6 +28,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'payments.query_budget.QueryBudgetMiddleware',  # Development and tests only
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # For static files in production
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -42,8 +45,14 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Templates are compiled once per process, not on every render
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -58,14 +67,65 @@ WSGI_APPLICATION = 'config.wsgi.application'
 
 # Database
 # Use DATABASE_URL if available (production), otherwise SQLite (development)
+#
+# Connection tuning (see `manage.py db_connections` to measure it):
+# - DB_CONN_MAX_AGE: seconds a worker keeps its connection (0 = per request).
+# - DB_POOLER=transaction when DATABASE_URL points at a transaction-mode
+#   pooler such as PgBouncer. Server-side cursors are then disabled because
+#   they do not survive across pooled transactions; the database's default
+#   timezone should be UTC since per-connection SETs are not kept either.
+# - DB_POOL_MAX_SIZE > 0 enables Django's native psycopg 3 pool (Django 5.1+).
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=600, cast=int)
+DB_CONN_HEALTH_CHECKS = config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool)
+DB_POOLER = config('DB_POOLER', default='')
+DB_SERVER_SIDE_CURSORS = config(
+    'DB_SERVER_SIDE_CURSORS',
+    default=DB_POOLER != 'transaction',
+    cast=bool
+)
+DB_POOL_MIN_SIZE = config('DB_POOL_MIN_SIZE', default=2, cast=int)
+DB_POOL_MAX_SIZE = config('DB_POOL_MAX_SIZE', default=0, cast=int)
+DB_POOL_TIMEOUT = config('DB_POOL_TIMEOUT', default=10, cast=float)
+
 DATABASES = {
     'default': dj_database_url.config(
         default=f'sqlite:///{BASE_DIR / "db.sqlite3"}',
-        conn_max_age=600,
-        conn_health_checks=True,
+        conn_max_age=DB_CONN_MAX_AGE,
+        conn_health_checks=DB_CONN_HEALTH_CHECKS,
     )
 }
 
+if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = not DB_SERVER_SIDE_CURSORS
+    if DB_POOL_MAX_SIZE:
+        if django.VERSION < (5, 1):
+            raise ImproperlyConfigured('DB_POOL_MAX_SIZE requires Django 5.1+ and psycopg 3')
+        # Pooled connections are returned to the pool after each request
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+            'min_size': DB_POOL_MIN_SIZE,
+            'max_size': DB_POOL_MAX_SIZE,
+            'timeout': DB_POOL_TIMEOUT,
+        }
+
+# Cache
+# Use REDIS_URL if available so rate limits and idempotency keys are shared
+# by all gunicorn workers, otherwise a per-process memory cache
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -89,9 +149,20 @@ USE_I18N = True
 USE_TZ = True
 
 # Static files (CSS, JavaScript, Images)
+# CSS/JS live in payments/static and are collected into content-hashed files,
+# which WhiteNoise serves compressed and cached forever (immutable)
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+# Cache lifetime for static files without a content hash in their name
+WHITENOISE_MAX_AGE = config('WHITENOISE_MAX_AGE', default=60 * 60, cast=int)
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -99,6 +170,82 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Stripe Configuration
 STRIPE_PUBLIC_KEY = config('STRIPE_PUBLIC_KEY', default='')
 STRIPE_SECRET_KEY = config('STRIPE_SECRET_KEY', default='')
+STRIPE_API_BASE = config('STRIPE_API_BASE', default='https://api.stripe.com')
+
+# Checkout rate limiting: bucket capacity (burst) and refill rate (tokens/s),
+# applied per client IP and per purchased item/order
+RATE_LIMIT_ENABLED = config('RATE_LIMIT_ENABLED', default=True, cast=bool)
+RATE_LIMIT_USE_X_FORWARDED_FOR = config('RATE_LIMIT_USE_X_FORWARDED_FOR', default=False, cast=bool)
+BUY_RATE_LIMIT_CLIENT = {
+    'capacity': config('BUY_RATE_LIMIT_CLIENT_BURST', default=10, cast=int),
+    'rate': config('BUY_RATE_LIMIT_CLIENT_RATE', default=0.2, cast=float),
+}
+BUY_RATE_LIMIT_TARGET = {
+    'capacity': config('BUY_RATE_LIMIT_TARGET_BURST', default=60, cast=int),
+    'rate': config('BUY_RATE_LIMIT_TARGET_RATE', default=2.0, cast=float),
+}
+
+# Warm pool of pre-created checkout sessions (see `manage.py run_checkout_pool`).
+# Items opt in with a non-zero "checkout pool size" in the admin.
+CHECKOUT_POOL_ENABLED = config('CHECKOUT_POOL_ENABLED', default=False, cast=bool)
+CHECKOUT_POOL_SESSION_TTL = config('CHECKOUT_POOL_SESSION_TTL', default=12 * 60 * 60, cast=int)
+CHECKOUT_POOL_EXPIRY_MARGIN = config('CHECKOUT_POOL_EXPIRY_MARGIN', default=60 * 60, cast=int)
+CHECKOUT_POOL_REFILL_INTERVAL = config('CHECKOUT_POOL_REFILL_INTERVAL', default=5, cast=float)
+CHECKOUT_POOL_CONCURRENCY = config('CHECKOUT_POOL_CONCURRENCY', default=4, cast=int)
+
+# Public URL of the site, used for Stripe redirects when there is no request;
+# the checkout pool worker refuses the localhost default outside DEBUG
+SITE_URL = config('SITE_URL', default='http://localhost:8000')
+
+# Bearer token for scraping /metrics/ (staff users can always view it)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+# Bearer token for the order endpoints of the JSON API (staff users can always read them)
+API_TOKEN = config('API_TOKEN', default='')
+
+# How long a checkout response is replayed for the same Idempotency-Key
+IDEMPOTENCY_KEY_TTL = config('IDEMPOTENCY_KEY_TTL', default=24 * 60 * 60, cast=int)
+
+# Admin bulk actions: selections above the sync limit are queued for
+# `manage.py run_bulk_actions`, updated in batches of BULK_ACTION_BATCH_SIZE rows.
+# Running jobs without progress for BULK_ACTION_STALE_AFTER seconds are resumed.
+BULK_ACTION_SYNC_LIMIT = config('BULK_ACTION_SYNC_LIMIT', default=1000, cast=int)
+BULK_ACTION_BATCH_SIZE = config('BULK_ACTION_BATCH_SIZE', default=500, cast=int)
+BULK_ACTION_POLL_INTERVAL = config('BULK_ACTION_POLL_INTERVAL', default=2, cast=float)
+BULK_ACTION_STALE_AFTER = config('BULK_ACTION_STALE_AFTER', default=10 * 60, cast=int)
+BULK_ACTION_STRIPE_CONCURRENCY = config('BULK_ACTION_STRIPE_CONCURRENCY', default=4, cast=int)
+
+# Order reconciliation (see `manage.py reconcile_orders`)
+RECONCILE_BATCH_SIZE = config('RECONCILE_BATCH_SIZE', default=200, cast=int)
+RECONCILE_CONCURRENCY = config('RECONCILE_CONCURRENCY', default=4, cast=int)
+# Orders created within this many seconds share one Stripe list window,
+# which covers sessions created up to RECONCILE_SESSION_WINDOW seconds after
+# the orders; sessions outside it are retrieved one by one
+RECONCILE_CLUSTER_SPAN = config('RECONCILE_CLUSTER_SPAN', default=60 * 60, cast=int)
+RECONCILE_SESSION_WINDOW = config('RECONCILE_SESSION_WINDOW', default=24 * 60 * 60, cast=int)
+RECONCILE_CHECKPOINT = config(
+    'RECONCILE_CHECKPOINT',
+    default=str(BASE_DIR / '.reconcile_orders.json')
+)
+
+# Order event stream (/events/orders): polling interval when Postgres
+# LISTEN/NOTIFY is unavailable (and safety re-check interval when it is),
+# keepalive interval, and how long a stream lasts before the client resumes
+EVENTS_POLL_INTERVAL = config('EVENTS_POLL_INTERVAL', default=1.0, cast=float)
+EVENTS_HEARTBEAT = config('EVENTS_HEARTBEAT', default=15, cast=int)
+EVENTS_STREAM_MAX_AGE = config('EVENTS_STREAM_MAX_AGE', default=300, cast=int)
+# Event batches a slow stream may fall behind by before it is closed
+EVENTS_MAX_PENDING = config('EVENTS_MAX_PENDING', default=1000, cast=int)
+EVENTS_BATCH_SIZE = config('EVENTS_BATCH_SIZE', default=500, cast=int)
+
+# Per-view query budgets (see payments.query_budget): enforced in development,
+# where an exceeded budget or repeated SQL is logged or raised
+QUERY_BUDGET_ENABLED = config('QUERY_BUDGET_ENABLED', default=DEBUG, cast=bool)
+QUERY_BUDGET_ACTION = config('QUERY_BUDGET_ACTION', default='log')  # 'log' or 'raise'
+# Repeated queries allowed in views without a budget
+QUERY_BUDGET_DUPLICATES = config('QUERY_BUDGET_DUPLICATES', default=0, cast=int)
+# Print views ranked by queries and DB time at the end of a test run
+QUERY_BUDGET_REPORT = config('QUERY_BUDGET_REPORT', default=False, cast=bool)
 
 # CSRF Trusted Origins (for production deployment)
 CSRF_TRUSTED_ORIGINS = config(
@@ -1,8 +1,44 @@
-from django.contrib import admin
-from .models import Item, Discount, Tax, Order
+from django.contrib import admin, messages
+from django.urls import reverse
+from django.utils.html import format_html
+from . import bulk_actions
+from .models import Item, Discount, Tax, Order, OrderEvent, PooledCheckoutSession, BulkActionJob
+from .query_budget import admin_query_budget
+from .search import search_items, search_orders
 
 
+def bulk_action(operation, description):
+    """
+    Build an admin action running a set-wise bulk operation
+    (see payments.bulk_actions) and reporting where to follow it.
+    """
+    def action(modeladmin, request, queryset):
+        job = bulk_actions.run(operation, queryset, request.user)
+        url = reverse('admin:payments_bulkactionjob_change', args=[job.pk])
+        if job.status == 'done':
+            modeladmin.message_user(request, format_html(
+                '{}: {} of {} selected updated (<a href="{}">job #{}</a>).',
+                description, job.updated, job.total, url, job.pk,
+            ), messages.SUCCESS)
+        elif job.status == 'failed':
+            modeladmin.message_user(request, format_html(
+                '{} failed: {} (<a href="{}">job #{}</a>).',
+                description, job.error, url, job.pk,
+            ), messages.ERROR)
+        else:
+            modeladmin.message_user(request, format_html(
+                '{} queued for {} objects, <a href="{}">follow its progress</a>.',
+                description, job.total, url,
+            ), messages.INFO)
+
+    action.__name__ = operation.replace('.', '_')
+    return admin.action(description=description)(action)
+
+
+# Query budgets include the session and user lookups. Changelists count their
+# results twice (filtered and total), hence one allowed repeat.
 @admin.register(Item)
+@admin_query_budget(changelist=5, add=5, change=5, duplicates=1)
 class ItemAdmin(admin.ModelAdmin):
     """
     Admin interface for Item model
@@ -17,14 +53,25 @@ class ItemAdmin(admin.ModelAdmin):
         ('Item Information', {
             'fields': ('name', 'description', 'price', 'currency')
         }),
+        ('Checkout', {
+            'fields': ('checkout_pool_size',),
+            'classes': ('collapse',)
+        }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
     )
 
+    def get_search_results(self, request, queryset, search_term):
+        """Use the indexed name/description search instead of LIKE scans"""
+        if not search_term.strip():
+            return queryset, False
+        return search_items(queryset, search_term), False
+
 
 @admin.register(Discount)
+@admin_query_budget(changelist=10, add=5, change=5, duplicates=1)
 class DiscountAdmin(admin.ModelAdmin):
     """
     Admin interface for Discount model
@@ -34,6 +81,10 @@ class DiscountAdmin(admin.ModelAdmin):
     search_fields = ['name', 'code']
     ordering = ['name']
     readonly_fields = ['created_at']
+    actions = [
+        bulk_action('discounts.activate', 'Activate selected discounts'),
+        bulk_action('discounts.deactivate', 'Deactivate selected discounts'),
+    ]
     
     fieldsets = (
         ('Discount Information', {
@@ -47,6 +98,7 @@ class DiscountAdmin(admin.ModelAdmin):
 
 
 @admin.register(Tax)
+@admin_query_budget(changelist=10, add=5, change=5, duplicates=1)
 class TaxAdmin(admin.ModelAdmin):
     """
     Admin interface for Tax model
@@ -56,6 +108,10 @@ class TaxAdmin(admin.ModelAdmin):
     search_fields = ['name', 'country']
     ordering = ['country', 'name']
     readonly_fields = ['created_at']
+    actions = [
+        bulk_action('taxes.activate', 'Activate selected taxes'),
+        bulk_action('taxes.deactivate', 'Deactivate selected taxes'),
+    ]
     
     fieldsets = (
         ('Tax Information', {
@@ -79,6 +135,7 @@ class OrderItemInline(admin.TabularInline):
 
 
 @admin.register(Order)
+@admin_query_budget(changelist=12, add=8, change=11, duplicates=1)
 class OrderAdmin(admin.ModelAdmin):
     """
     Admin interface for Order model
@@ -86,8 +143,15 @@ class OrderAdmin(admin.ModelAdmin):
     list_display = ['id', 'status', 'get_total_display', 'items_count', 'created_at']
     list_filter = ['status', 'created_at']
     search_fields = ['id', 'stripe_session_id']
+    search_help_text = 'Order ID (e.g. 42) or Stripe session ID prefix (e.g. cs_test_a1b2)'
     ordering = ['-created_at']
     readonly_fields = ['stripe_session_id', 'created_at', 'updated_at', 'display_totals']
+    list_select_related = ['discount', 'tax']
+    actions = [
+        bulk_action('orders.mark_paid', 'Mark selected orders as paid'),
+        bulk_action('orders.mark_cancelled', 'Cancel selected orders'),
+        bulk_action('orders.reprice_pending', 'Reprice selected pending orders'),
+    ]
     
     filter_horizontal = ['items']
     
@@ -108,9 +172,19 @@ class OrderAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_queryset(self, request):
+        # Totals and item counts in the changelist read the prefetched items
+        return super().get_queryset(request).prefetch_related('items')
+
+    def get_search_results(self, request, queryset, search_term):
+        """Route ID and session ID searches to exact/prefix index lookups"""
+        if not search_term.strip():
+            return queryset, False
+        return search_orders(queryset, search_term), False
+
     def items_count(self, obj):
         """Display number of items in order"""
-        return obj.items.count()
+        return len(obj.items.all())
     items_count.short_description = 'Items'
 
     def get_total_display(self, obj):
@@ -140,4 +214,64 @@ class OrderAdmin(admin.ModelAdmin):
                 f"Total: {symbol}{total:.2f}"
             )
         return "Save the order first to see totals"
-    display_totals.short_description = 'Price Breakdown'
\ No newline at end of file
+    display_totals.short_description = 'Price Breakdown'
+
+
+@admin.register(PooledCheckoutSession)
+@admin_query_budget(changelist=6, change=6, duplicates=1)
+class PooledCheckoutSessionAdmin(admin.ModelAdmin):
+    """
+    Read-only view of the pre-created checkout sessions pool
+    """
+    list_display = ['stripe_session_id', 'item', 'expires_at', 'claimed_at', 'creation_ms']
+    list_filter = ['claimed_at', 'item']
+    list_select_related = ['item']
+    ordering = ['expires_at']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(BulkActionJob)
+@admin_query_budget(changelist=6, change=6, duplicates=1)
+class BulkActionJobAdmin(admin.ModelAdmin):
+    """
+    Audit trail and progress of admin bulk actions
+    """
+    list_display = ['id', 'action', 'model', 'user', 'status', 'progress', 'updated', 'created_at']
+    list_filter = ['status', 'action', 'created_at']
+    list_select_related = ['user']
+    ordering = ['-created_at']
+    exclude = ['object_ids']
+
+    def progress(self, obj):
+        """Display processed objects out of the selection"""
+        return f"{obj.processed}/{obj.total} ({obj.get_progress()}%)"
+    progress.short_description = 'Progress'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(OrderEvent)
+@admin_query_budget(changelist=6, change=7, duplicates=1)
+class OrderEventAdmin(admin.ModelAdmin):
+    """
+    Read-only outbox of order status transitions
+    """
+    list_display = ['id', 'order', 'old_status', 'new_status', 'created_at']
+    list_filter = ['new_status', 'created_at']
+    list_select_related = ['order']
+    ordering = ['-id']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
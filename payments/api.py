@@ -0,0 +1,251 @@
+"""
+Read-only JSON API for items and orders.
+
+- Sparse fieldsets: `?fields=id,name,price`
+- Keyset pagination: `?after=<last id>&limit=<n>`, with a `next` link
+- Conditional requests: ETag built from the objects' versions
+  (updated_at, plus discount/tax state for orders); If-None-Match gets a 304
+  before the response is serialized
+- gzip when the client accepts it
+"""
+import hashlib
+import hmac
+from functools import wraps
+
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.http import urlencode
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_GET
+
+from .models import Item, Order
+from .query_budget import query_budget
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+
+
+def _money(value):
+    return f'{value:.2f}'
+
+
+ITEM_FIELDS = {
+    'id': lambda item: item.id,
+    'name': lambda item: item.name,
+    'description': lambda item: item.description,
+    'price': lambda item: _money(item.price),
+    'currency': lambda item: item.currency,
+    'display_price': lambda item: item.get_display_price(),
+    'created_at': lambda item: item.created_at.isoformat(),
+    'updated_at': lambda item: item.updated_at.isoformat(),
+}
+
+# Totals are computed once per order, see serialize_order()
+ORDER_FIELDS = {
+    'id': lambda order, totals: order.id,
+    'status': lambda order, totals: order.status,
+    'items': lambda order, totals: [
+        {'id': item.id, 'name': item.name, 'price': _money(item.price), 'currency': item.currency}
+        for item in order.items.all()
+    ],
+    'discount': lambda order, totals: order.discount.code if order.discount else None,
+    'tax': lambda order, totals: order.tax.name if order.tax else None,
+    'currency': lambda order, totals: order.get_currency(),
+    'subtotal': lambda order, totals: _money(totals()['subtotal']),
+    'discount_amount': lambda order, totals: _money(totals()['discount']),
+    'tax_amount': lambda order, totals: _money(totals()['tax']),
+    'total': lambda order, totals: _money(totals()['total']),
+    'created_at': lambda order, totals: order.created_at.isoformat(),
+    'updated_at': lambda order, totals: order.updated_at.isoformat(),
+}
+
+
+class BadRequest(Exception):
+    """Invalid query parameters, reported as a 400 response"""
+
+
+def api_view(view_func):
+    """GET-only JSON view, gzipped, turning BadRequest into a 400 response"""
+    @require_GET
+    @gzip_page
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view_func(request, *args, **kwargs)
+        except BadRequest as e:
+            return JsonResponse({'error': str(e)}, status=400)
+    return wrapper
+
+
+def has_bearer_token(request, token):
+    """Whether the request sends `Authorization: Bearer <token>`; never for an empty token"""
+    if not token:
+        return False
+    provided = request.headers.get('Authorization', '')
+    # As bytes: compare_digest raises TypeError for non-ASCII str
+    return hmac.compare_digest(provided.encode(), f'Bearer {token}'.encode())
+
+
+def has_api_access(request):
+    """Staff users, or clients sending `Authorization: Bearer API_TOKEN`"""
+    return request.user.is_staff or has_bearer_token(request, settings.API_TOKEN)
+
+
+def require_api_access(view_func):
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not has_api_access(request):
+            return JsonResponse({'error': 'Authentication required'}, status=403)
+        return view_func(request, *args, **kwargs)
+    return wrapper
+
+
+def get_fields(request, available):
+    """Parse `?fields=` into an ordered list of field names"""
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(available)
+    fields = [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in available]
+    if unknown:
+        raise BadRequest(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+def paginate(request, queryset):
+    """
+    Return one page of `queryset` in primary key order after `?after=`,
+    and the URL of the next page (or None).
+    """
+    try:
+        after = int(request.GET.get('after', 0))
+        limit = min(int(request.GET.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+    except ValueError:
+        raise BadRequest('after and limit must be integers')
+    if limit < 1:
+        raise BadRequest('limit must be positive')
+
+    page = list(queryset.filter(pk__gt=after).order_by('pk')[:limit + 1])
+    next_url = None
+    if len(page) > limit:
+        page = page[:limit]
+        params = request.GET.copy()
+        params['after'] = page[-1].pk
+        next_url = request.build_absolute_uri(f'{request.path}?{urlencode(params, doseq=True)}')
+    return page, next_url
+
+
+def conditional_json(request, data_func, versions):
+    """
+    Respond 304 if the client's If-None-Match matches the ETag built from
+    `versions`, otherwise serialize `data_func()`.
+    """
+    digest = hashlib.md5(repr((request.get_full_path(), versions)).encode()).hexdigest()
+    etag = f'"{digest}"'
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponse(status=304)
+    else:
+        response = JsonResponse(data_func())
+    response['ETag'] = etag
+    patch_vary_headers(response, ['Authorization', 'Cookie'])
+    return response
+
+
+def serialize_item(item, fields):
+    return {name: ITEM_FIELDS[name](item) for name in fields}
+
+
+def item_version(item):
+    return (item.pk, item.updated_at.isoformat())
+
+
+def serialize_order(order, fields):
+    cache = {}
+
+    def totals():
+        if 'totals' not in cache:
+            cache['totals'] = order.get_totals()
+        return cache['totals']
+
+    return {name: ORDER_FIELDS[name](order, totals) for name in fields}
+
+
+def order_version(order):
+    """Everything an order's representation depends on"""
+    discount, tax = order.discount, order.tax
+    return (
+        order.pk,
+        order.updated_at.isoformat(),
+        discount and (discount.pk, discount.active, discount.discount_type, str(discount.value)),
+        tax and (tax.pk, tax.active, str(tax.rate)),
+        [item_version(item) for item in order.items.all()],
+    )
+
+
+def order_queryset():
+    """Orders with everything needed for totals and ETags in two queries"""
+    return Order.objects.select_related('discount', 'tax').prefetch_related('items')
+
+
+@query_budget(1)
+@api_view
+def item_list(request):
+    """
+    List items
+    GET /api/items/?fields=&after=&limit=
+    """
+    fields = get_fields(request, ITEM_FIELDS)
+    items, next_url = paginate(request, Item.objects.all())
+    return conditional_json(
+        request,
+        lambda: {'results': [serialize_item(item, fields) for item in items], 'next': next_url},
+        [item_version(item) for item in items],
+    )
+
+
+@query_budget(1)
+@api_view
+def item_detail(request, id):
+    """
+    Item detail
+    GET /api/items/{id}/?fields=
+    """
+    fields = get_fields(request, ITEM_FIELDS)
+    item = Item.objects.filter(pk=id).first()
+    if item is None:
+        return JsonResponse({'error': 'Item not found'}, status=404)
+    return conditional_json(request, lambda: serialize_item(item, fields), item_version(item))
+
+
+# Session and user for staff, orders with discount and tax, their items
+@query_budget(4)
+@api_view
+@require_api_access
+def order_list(request):
+    """
+    List orders with computed totals, in a constant number of queries
+    GET /api/orders/?fields=&after=&limit=
+    """
+    fields = get_fields(request, ORDER_FIELDS)
+    orders, next_url = paginate(request, order_queryset())
+    return conditional_json(
+        request,
+        lambda: {'results': [serialize_order(order, fields) for order in orders], 'next': next_url},
+        [order_version(order) for order in orders],
+    )
+
+
+@query_budget(4)
+@api_view
+@require_api_access
+def order_detail(request, id):
+    """
+    Order detail with computed totals
+    GET /api/orders/{id}/?fields=
+    """
+    fields = get_fields(request, ORDER_FIELDS)
+    order = order_queryset().filter(pk=id).first()
+    if order is None:
+        return JsonResponse({'error': 'Order not found'}, status=404)
+    return conditional_json(request, lambda: serialize_order(order, fields), order_version(order))
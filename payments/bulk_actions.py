@@ -0,0 +1,185 @@
+"""
+Set-wise bulk operations for the admin.
+
+Each operation is a single `QuerySet.update()` over the selection (plus
+one bulk insert of order events for status changes). Small
+selections are updated inline; large ones are queued as a BulkActionJob,
+which also serves as the audit record, and processed in primary key batches
+by `manage.py run_bulk_actions`. The job keeps the selection and its
+progress is committed with each batch, so a job whose worker died is
+picked up again where it stopped.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import BulkActionJob, Discount, Order, Tax
+from .stripe_client import get_stripe
+
+logger = logging.getLogger(__name__)
+
+
+def _set_order_status(status):
+    def apply(queryset):
+        # Records the transitions in the order event outbox as well
+        return queryset.set_status(status)
+    return apply
+
+
+def _set_active(active):
+    def apply(queryset):
+        return queryset.exclude(active=active).update(active=active)
+    return apply
+
+
+def _expire_session(session_id):
+    """
+    Expire a Checkout Session; returns whether it can no longer be paid.
+    Completed sessions are kept for reconcile_orders to mark the order paid.
+    """
+    stripe = get_stripe()
+    try:
+        stripe.checkout.Session.expire(session_id)
+    except stripe.error.InvalidRequestError as e:
+        if e.http_status == 404:
+            return True
+        # No longer open: expired already, or completed
+        return stripe.checkout.Session.retrieve(session_id).status == 'expired'
+    return True
+
+
+def _expire_sessions(session_ids):
+    """Expire Checkout Sessions in parallel; returns the IDs that can no longer be paid"""
+    with ThreadPoolExecutor(max_workers=settings.BULK_ACTION_STRIPE_CONCURRENCY) as executor:
+        expired = list(executor.map(_expire_session, session_ids))
+    return {session_id for session_id, done in zip(session_ids, expired) if done}
+
+
+def _reprice_pending(queryset):
+    # Pricing is computed from current items, discount and tax; dropping the
+    # Stripe session makes the next checkout use those prices. The session is
+    # expired first so it cannot be paid at the old price.
+    pending = queryset.filter(status='pending')
+    sessions = dict(
+        pending.exclude(stripe_session_id=None).exclude(stripe_session_id='')
+        .values_list('pk', 'stripe_session_id')
+    )
+    expired = _expire_sessions(list(sessions.values()))
+    # Only drop the session that was expired: a checkout started meanwhile
+    # has stored a new, payable one
+    return pending.filter(
+        Q(stripe_session_id=None)
+        | Q(stripe_session_id='')
+        | Q(
+            pk__in=[pk for pk, session_id in sessions.items() if session_id in expired],
+            stripe_session_id__in=expired,
+        )
+    ).update(
+        stripe_session_id=None,
+        updated_at=timezone.now(),
+    )
+
+
+# Operation name -> (model, function applying it to a queryset)
+OPERATIONS = {
+    'orders.mark_paid': (Order, _set_order_status('paid')),
+    'orders.mark_cancelled': (Order, _set_order_status('cancelled')),
+    'orders.reprice_pending': (Order, _reprice_pending),
+    'discounts.activate': (Discount, _set_active(True)),
+    'discounts.deactivate': (Discount, _set_active(False)),
+    'taxes.activate': (Tax, _set_active(True)),
+    'taxes.deactivate': (Tax, _set_active(False)),
+}
+
+# Operations calling Stripe for each object: always queued, since even a
+# small selection could outlast the admin request's worker timeout
+QUEUED_OPERATIONS = {'orders.reprice_pending'}
+
+
+def run(operation, queryset, user=None):
+    """
+    Apply `operation` to the selected objects and return its BulkActionJob.
+    Selections larger than BULK_ACTION_SYNC_LIMIT, and QUEUED_OPERATIONS,
+    are queued for the worker.
+    """
+    model, _ = OPERATIONS[operation]
+    ids = list(queryset.order_by('pk').values_list('pk', flat=True))
+    inline = operation not in QUEUED_OPERATIONS and len(ids) <= settings.BULK_ACTION_SYNC_LIMIT
+    job = BulkActionJob.objects.create(
+        action=operation,
+        model=model._meta.label,
+        user=user if user and user.is_authenticated else None,
+        total=len(ids),
+        object_ids=ids,
+        status='running' if inline else 'queued',
+        heartbeat_at=timezone.now(),
+    )
+
+    if inline:
+        process(job)
+        job.refresh_from_db()
+    return job
+
+
+def process(job):
+    """
+    Apply the job's operation to its selection in batches, from the first
+    object not processed yet. Each batch commits with its progress.
+    """
+    job_id = job.pk
+    model, apply = OPERATIONS[job.action]
+    batch_size = settings.BULK_ACTION_BATCH_SIZE
+    ids = job.object_ids
+    try:
+        for start in range(job.processed, len(ids), batch_size):
+            batch = ids[start:start + batch_size]
+            with transaction.atomic():
+                updated = apply(model.objects.filter(pk__in=batch))
+                BulkActionJob.objects.filter(pk=job_id).update(
+                    processed=F('processed') + len(batch),
+                    updated=F('updated') + updated,
+                    heartbeat_at=timezone.now(),
+                )
+    except Exception as e:
+        logger.exception('Bulk action job %s failed', job_id)
+        BulkActionJob.objects.filter(pk=job_id).update(
+            status='failed', error=str(e), finished_at=timezone.now(),
+        )
+        return
+    BulkActionJob.objects.filter(pk=job_id).update(status='done', finished_at=timezone.now())
+
+
+def claim_next():
+    """
+    Claim the oldest queued job, or a running one whose worker stopped
+    reporting progress BULK_ACTION_STALE_AFTER seconds ago. Returns None
+    when there is nothing to do.
+    """
+    stale = timezone.now() - timedelta(seconds=settings.BULK_ACTION_STALE_AFTER)
+    candidates = BulkActionJob.objects.filter(
+        Q(status='queued') | Q(status='running', heartbeat_at__lt=stale)
+    ).order_by('created_at').values_list('pk', 'status', 'heartbeat_at')
+    for pk, status, heartbeat_at in candidates[:10]:
+        # Only one worker wins the compare-and-set
+        claimed = BulkActionJob.objects.filter(
+            pk=pk, status=status, heartbeat_at=heartbeat_at,
+        ).update(status='running', heartbeat_at=timezone.now())
+        if claimed:
+            if status == 'running':
+                logger.warning('Resuming stale bulk action job %s', pk)
+            return BulkActionJob.objects.get(pk=pk)
+    return None
+
+
+def run_pending():
+    """Process queued and stale jobs until none is left; returns how many ran"""
+    count = 0
+    while (job := claim_next()) is not None:
+        process(job)
+        count += 1
+    return count
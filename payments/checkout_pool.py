@@ -0,0 +1,209 @@
+"""
+Warm pool of pre-created Stripe Checkout Sessions for hot items.
+
+`manage.py run_checkout_pool` keeps `Item.checkout_pool_size` unclaimed
+sessions per item. The buy view claims one with a single locked UPDATE
+instead of waiting for Stripe, and falls back to creating a session when
+the pool is empty.
+"""
+import logging
+import time
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from . import metrics
+from .models import Item, PooledCheckoutSession
+from .stripe_client import get_stripe
+
+logger = logging.getLogger(__name__)
+
+# SITE_URL hosts only reachable by a developer, such as the default
+LOCAL_HOSTS = {'localhost', '127.0.0.1', '::1'}
+
+
+def item_session_params(item, domain):
+    """Checkout Session parameters for buying a single item"""
+    return {
+        'payment_method_types': ['card'],
+        'line_items': [{
+            'price_data': {
+                'currency': item.currency,
+                'product_data': {
+                    'name': item.name,
+                    'description': item.description,
+                },
+                'unit_amount': item.get_stripe_price(),
+            },
+            'quantity': 1,
+        }],
+        'mode': 'payment',
+        'success_url': f"{domain}/success/",
+        'cancel_url': f"{domain}/cancel/",
+    }
+
+
+def check_settings():
+    """
+    Raise ImproperlyConfigured when the pool worker cannot run as deployed:
+    its counters must reach the web workers through a shared cache, and
+    outside DEBUG the sessions it creates must not redirect buyers to
+    localhost.
+    """
+    if not metrics.is_shared():
+        raise ImproperlyConfigured(
+            'The checkout pool needs a cache shared with the web workers for its '
+            'metrics: set REDIS_URL.'
+        )
+    if not settings.DEBUG and urlsplit(settings.SITE_URL).hostname in LOCAL_HOSTS:
+        raise ImproperlyConfigured(
+            f'Pooled sessions would redirect buyers to {settings.SITE_URL}: '
+            f'set SITE_URL to the public site URL.'
+        )
+
+
+def min_expiry():
+    """Sessions expiring before this are no longer handed out"""
+    return timezone.now() + timedelta(seconds=settings.CHECKOUT_POOL_EXPIRY_MARGIN)
+
+
+def claim_session(item):
+    """
+    Atomically take an unclaimed, unexpired session priced from the current
+    item version. Returns its Stripe session ID, or None if the pool is empty.
+    """
+    candidates = PooledCheckoutSession.objects.filter(
+        item=item,
+        item_updated_at=item.updated_at,
+        claimed_at__isnull=True,
+        expires_at__gt=min_expiry(),
+    ).order_by('expires_at')
+
+    # The conditional UPDATE makes the claim safe on databases without
+    # row locks (SQLite); retry if another request won the race.
+    for _ in range(3):
+        with transaction.atomic():
+            pooled = candidates.select_for_update(skip_locked=True).first()
+            if pooled is None:
+                break
+            claimed = PooledCheckoutSession.objects.filter(
+                pk=pooled.pk,
+                claimed_at__isnull=True,
+            ).update(claimed_at=timezone.now())
+        if claimed:
+            metrics.increment('checkout_pool_hits_total')
+            metrics.increment('checkout_pool_latency_saved_ms_total', pooled.creation_ms)
+            return pooled.stripe_session_id
+
+    metrics.increment('checkout_pool_misses_total')
+    return None
+
+
+def retire_sessions():
+    """
+    Take unclaimed sessions out of the pool before Stripe expires them, or
+    when the item was edited since they were created, and expire them on
+    Stripe. Returns the number of sessions retired.
+    """
+    stale = PooledCheckoutSession.objects.filter(claimed_at__isnull=True).filter(
+        Q(expires_at__lte=min_expiry())
+        | ~Q(item_updated_at=F('item__updated_at'))
+        | Q(item__checkout_pool_size=0)
+    )
+    stripe = get_stripe()
+    retired = 0
+    for pooled in stale.only('pk', 'stripe_session_id'):
+        # Claim before expiring so a concurrent buyer never gets this session
+        if not PooledCheckoutSession.objects.filter(
+            pk=pooled.pk, claimed_at__isnull=True
+        ).update(claimed_at=timezone.now()):
+            continue
+        try:
+            stripe.checkout.Session.expire(pooled.stripe_session_id)
+        except stripe.error.StripeError:
+            # Already expired or completed on Stripe's side
+            pass
+        retired += 1
+
+    if retired:
+        metrics.increment('checkout_pool_sessions_retired_total', retired)
+    return retired
+
+
+def prune_claimed(age=timedelta(days=1)):
+    """Delete rows of sessions claimed more than `age` ago"""
+    deleted, _ = PooledCheckoutSession.objects.filter(
+        claimed_at__lt=timezone.now() - age
+    ).delete()
+    return deleted
+
+
+def _create_remote_session(item):
+    """Create a session on Stripe, returning (session_id, expires_at, creation_ms)"""
+    expires_at = timezone.now() + timedelta(seconds=settings.CHECKOUT_POOL_SESSION_TTL)
+    started = time.monotonic()
+    session = get_stripe().checkout.Session.create(
+        **item_session_params(item, settings.SITE_URL),
+        expires_at=int(expires_at.timestamp()),
+    )
+    creation_ms = int((time.monotonic() - started) * 1000)
+    return session.id, expires_at, creation_ms
+
+
+def replenish(executor):
+    """
+    Top up the pool of every hot item. Stripe calls run on `executor`;
+    database writes stay on the calling thread. Returns the number of
+    sessions created.
+    """
+    items = Item.objects.filter(checkout_pool_size__gt=0).annotate(
+        available=Count(
+            'pooled_sessions',
+            filter=Q(
+                pooled_sessions__claimed_at__isnull=True,
+                pooled_sessions__item_updated_at=F('updated_at'),
+                pooled_sessions__expires_at__gt=min_expiry(),
+            ),
+        )
+    )
+    wanted = []
+    for item in items:
+        wanted.extend([item] * max(item.checkout_pool_size - item.available, 0))
+    if not wanted:
+        return 0
+
+    stripe = get_stripe()
+    futures = [(item, executor.submit(_create_remote_session, item)) for item in wanted]
+    pooled = []
+    for item, future in futures:
+        try:
+            session_id, expires_at, creation_ms = future.result()
+        except stripe.error.StripeError as e:
+            logger.warning('Could not create pooled session for item %s: %s', item.id, e)
+            continue
+        pooled.append(PooledCheckoutSession(
+            item=item,
+            stripe_session_id=session_id,
+            item_updated_at=item.updated_at,
+            expires_at=expires_at,
+            creation_ms=creation_ms,
+        ))
+
+    PooledCheckoutSession.objects.bulk_create(pooled)
+    if pooled:
+        metrics.increment('checkout_pool_sessions_created_total', len(pooled))
+    return len(pooled)
+
+
+def run_cycle(executor):
+    """One maintenance pass of the pool worker"""
+    return {
+        'retired': retire_sessions(),
+        'pruned': prune_claimed(),
+        'created': replenish(executor),
+    }
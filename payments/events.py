@@ -0,0 +1,232 @@
+"""
+Push delivery of order status transitions.
+
+Transitions are written to the OrderEvent outbox in the same transaction as
+the status change. One EventBroker thread per process waits for new events
+(Postgres LISTEN on OrderEvent.CHANNEL, or polling every EVENTS_POLL_INTERVAL
+seconds on other databases), reads them once and fans them out to every open
+`/events/orders` stream. Streams resume from a cursor (Last-Event-ID or
+`?after=`), reading anything they missed from the outbox first.
+"""
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Max
+from django.http import HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+
+from .api import has_api_access
+from .models import Order, OrderEvent
+
+logger = logging.getLogger(__name__)
+
+# Milliseconds EventSource clients wait before reconnecting
+RETRY_MS = 2000
+
+
+def latest_event_id():
+    return OrderEvent.objects.aggregate(latest=Max('id'))['latest'] or 0
+
+
+def read_events(after, statuses=None, limit=None):
+    """Events after the `after` id, oldest first, as dicts"""
+    queryset = OrderEvent.objects.filter(pk__gt=after).order_by('pk')
+    if statuses:
+        queryset = queryset.filter(new_status__in=statuses)
+    return [event.as_dict() for event in queryset[:limit or settings.EVENTS_BATCH_SIZE]]
+
+
+class Subscription:
+    """Batches of events for one stream, pushed from the broker thread"""
+
+    def __init__(self, loop, max_pending):
+        self.loop = loop
+        self.queue = asyncio.Queue()
+        self.max_pending = max_pending
+        self.overflowed = False
+
+    def push(self, events):
+        self.loop.call_soon_threadsafe(self._put, events)
+
+    def _put(self, events):
+        if self.overflowed:
+            return
+        if self.queue.qsize() >= self.max_pending:
+            # Too far behind: end the stream, the client resumes from the outbox
+            self.overflowed = True
+            events = None
+        self.queue.put_nowait(events)
+
+    async def get(self, timeout):
+        """Next batch of events, [] after `timeout` seconds, None once overflowed"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return []
+
+
+class EventBroker:
+    """Reads new OrderEvents once per process and fans them out to subscribers"""
+
+    def __init__(self):
+        self.subscribers = set()
+        self.lock = threading.Lock()
+        self.last_id = None
+        self.thread = None
+
+    def start(self):
+        """Start the broker thread from the current end of the outbox, once"""
+        with self.lock:
+            if self.thread is not None:
+                return
+            self.last_id = latest_event_id()
+            self.thread = threading.Thread(target=self.run, name='order-events', daemon=True)
+            self.thread.start()
+
+    def subscribe(self):
+        """Register the running event loop's stream; call start() first"""
+        subscription = Subscription(asyncio.get_running_loop(), settings.EVENTS_MAX_PENDING)
+        with self.lock:
+            self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscribers.discard(subscription)
+
+    def dispatch(self, events):
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for subscription in subscribers:
+            if subscription.overflowed:
+                self.unsubscribe(subscription)
+                continue
+            try:
+                subscription.push(events)
+            except RuntimeError:
+                # Its event loop is closed
+                self.unsubscribe(subscription)
+
+    def run(self):
+        while True:
+            try:
+                self.listen()
+            except Exception:
+                logger.exception('Order event broker failed, reconnecting')
+                connection.close()
+                time.sleep(settings.EVENTS_POLL_INTERVAL)
+
+    def listen(self):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f'LISTEN {OrderEvent.CHANNEL}')
+            wait = self.wait_for_notify
+        else:
+            wait = time.sleep
+        while True:
+            self.fetch()
+            wait(settings.EVENTS_POLL_INTERVAL)
+
+    def wait_for_notify(self, timeout):
+        # The timeout doubles as a safety re-check for missed notifications
+        raw = connection.connection
+        if select.select([raw], [], [], timeout)[0]:
+            raw.poll()
+            raw.notifies.clear()
+
+    def fetch(self):
+        """Dispatch every event after the last one seen, in batches"""
+        while True:
+            events = read_events(self.last_id)
+            if not events:
+                return
+            self.last_id = events[-1]['id']
+            self.dispatch(events)
+            if len(events) < settings.EVENTS_BATCH_SIZE:
+                return
+
+
+broker = EventBroker()
+
+
+def format_event(event):
+    return f"id: {event['id']}\ndata: {json.dumps(event)}\n\n"
+
+
+async def stream_events(subscription, cursor, statuses):
+    """Events after `cursor` from the outbox, then live ones, with keepalives"""
+    deadline = time.monotonic() + settings.EVENTS_STREAM_MAX_AGE
+    try:
+        yield f'retry: {RETRY_MS}\n\n'
+        while True:
+            events = await sync_to_async(read_events)(cursor, statuses)
+            for event in events:
+                yield format_event(event)
+            if events:
+                cursor = events[-1]['id']
+            if len(events) < settings.EVENTS_BATCH_SIZE:
+                break
+
+        while time.monotonic() < deadline:
+            events = await subscription.get(settings.EVENTS_HEARTBEAT)
+            if events is None:
+                break
+            if not events:
+                yield ': keepalive\n\n'
+                continue
+            for event in events:
+                # Skip what the catch-up above already sent
+                if event['id'] > cursor and (not statuses or event['status'] in statuses):
+                    yield format_event(event)
+            cursor = max(cursor, events[-1]['id'])
+    finally:
+        broker.unsubscribe(subscription)
+
+
+async def order_events(request):
+    """
+    Server-Sent Events stream of order status transitions
+    GET /events/orders?after=&status=
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    if not await sync_to_async(has_api_access)(request):
+        return JsonResponse({'error': 'Authentication required'}, status=403)
+    if not isinstance(request, ASGIRequest):
+        # A WSGI worker would buffer the whole stream and be held for
+        # EVENTS_STREAM_MAX_AGE seconds
+        return JsonResponse(
+            {'error': 'Event streams are only served by the ASGI application'}, status=501,
+        )
+
+    statuses = [status for status in request.GET.getlist('status') if status]
+    valid = {value for value, _ in Order.STATUS_CHOICES}
+    if not set(statuses) <= valid:
+        return JsonResponse({'error': f"status must be one of: {', '.join(sorted(valid))}"}, status=400)
+    cursor = request.headers.get('Last-Event-ID') or request.GET.get('after')
+    try:
+        cursor = int(cursor) if cursor else None
+    except ValueError:
+        return JsonResponse({'error': 'Last-Event-ID and after must be integers'}, status=400)
+
+    await sync_to_async(broker.start)()
+    if cursor is None:
+        # Live events only; anything dispatched before subscribing is caught up
+        cursor = broker.last_id
+    subscription = broker.subscribe()
+
+    response = StreamingHttpResponse(
+        stream_events(subscription, cursor, statuses),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx-style proxies from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,46 @@
+"""
+Idempotency keys for the checkout endpoints.
+
+Clients send an `Idempotency-Key` header with each POST. A successful
+response is cached under that key and replayed for retries, and the key is
+forwarded to Stripe so a retried request never creates a second session.
+"""
+import json
+import re
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+
+IDEMPOTENCY_KEY_RE = re.compile(r'^[A-Za-z0-9_\-]{8,100}$')
+
+
+def idempotent(view_func):
+    """
+    Require an Idempotency-Key header and replay the stored response for a
+    key that was already used on the same URL. The key is passed to the view
+    as `request.idempotency_key`.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get('Idempotency-Key', '')
+        if not IDEMPOTENCY_KEY_RE.match(key):
+            return JsonResponse(
+                {'error': 'A valid Idempotency-Key header is required'},
+                status=400,
+            )
+
+        cache_key = f'idempotency:{request.path}:{key}'
+        stored = cache.get(cache_key)
+        if stored is not None:
+            response = JsonResponse(json.loads(stored))
+            response['Idempotent-Replayed'] = 'true'
+            return response
+
+        request.idempotency_key = key
+        response = view_func(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(cache_key, response.content.decode(), settings.IDEMPOTENCY_KEY_TTL)
+        return response
+    return wrapper
@@ -0,0 +1,112 @@
+import random
+import statistics
+import time
+
+from django.contrib import admin
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+
+from payments.models import Item, Order
+
+WORDS = [
+    'wireless', 'ergonomic', 'mechanical', 'keyboard', 'mouse', 'headphones',
+    'premium', 'aluminum', 'stand', 'watch', 'fitness', 'tracker', 'compact',
+    'portable', 'charger', 'cable', 'speaker', 'bluetooth', 'monitor', 'lamp',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares Django default admin search with the indexed search on a '
+        'generated dataset. All generated rows are rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=50000, help='Items to generate')
+        parser.add_argument('--orders', type=int, default=50000, help='Orders to generate')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per query')
+        parser.add_argument(
+            '--explain', action='store_true',
+            help="Print the query plan of each indexed search, to check it uses the indexes",
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        request = RequestFactory().get('/admin/')
+        item_admin = admin.site._registry[Item]
+        order_admin = admin.site._registry[Order]
+
+        with transaction.atomic():
+            self.stdout.write(
+                f"Generating {options['items']} items and {options['orders']} orders "
+                f"on {connection.vendor}..."
+            )
+            self.generate(rng, options['items'], options['orders'])
+            sample_session = Order.objects.order_by('?').values_list(
+                'stripe_session_id', flat=True
+            ).first() or 'cs_test_missing'
+
+            cases = [
+                (item_admin, 'wireless'),
+                (item_admin, 'ergonomic mouse'),
+                (order_admin, str(Order.objects.order_by('?').values_list('id', flat=True).first())),
+                (order_admin, sample_session),
+                (order_admin, sample_session[:14]),
+            ]
+            self.stdout.write(f"\n{'Query':<40} {'default':>12} {'indexed':>12} {'speedup':>9}")
+            for model_admin, term in cases:
+                default = self.measure(
+                    lambda qs: admin.ModelAdmin.get_search_results(model_admin, request, qs, term),
+                    model_admin, options['repeat'],
+                )
+                indexed = self.measure(
+                    lambda qs: model_admin.get_search_results(request, qs, term),
+                    model_admin, options['repeat'],
+                )
+                label = f'{model_admin.model.__name__}: {term}'[:40]
+                self.stdout.write(
+                    f'{label:<40} {default:>9.1f} ms {indexed:>9.1f} ms {default / indexed:>8.1f}x'
+                )
+                if options['explain']:
+                    queryset, _ = model_admin.get_search_results(
+                        request, model_admin.model.objects.all(), term
+                    )
+                    self.stdout.write(f'{queryset.explain()}\n')
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS('\n✅ Benchmark complete, generated data rolled back'))
+
+    def generate(self, rng, item_count, order_count):
+        def sentence(length):
+            return ' '.join(rng.choice(WORDS) for _ in range(length))
+
+        Item.objects.bulk_create(
+            (
+                Item(name=sentence(3), description=sentence(12), price='9.99')
+                for _ in range(item_count)
+            ),
+            batch_size=1000,
+        )
+        Order.objects.bulk_create(
+            (
+                Order(stripe_session_id=f"cs_test_{rng.getrandbits(256):064x}")
+                for _ in range(order_count)
+            ),
+            batch_size=1000,
+        )
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE payments_item, payments_order')
+
+    def measure(self, search, model_admin, repeat):
+        """Median time in ms to fetch the first changelist page and count matches"""
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            queryset, _ = search(model_admin.model.objects.all())
+            list(queryset[:model_admin.list_per_page])
+            queryset.count()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
@@ -0,0 +1,87 @@
+import gzip
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from payments.models import Discount, Item, Order, Tax
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares payload size and latency of the HTML pages with the JSON API '
+        'on a generated dataset. All generated rows are rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=100, help='Items to generate')
+        parser.add_argument('--repeat', type=int, default=20, help='Requests per endpoint')
+
+    def handle(self, *args, **options):
+        # Pages are rendered in-process, without a collected static manifest
+        with override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+            STORAGES={
+                **settings.STORAGES,
+                'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+            },
+        ), transaction.atomic():
+            items, order = self.generate(options['items'])
+            client = Client()
+            client.force_login(get_user_model().objects.create(username='bench-api', is_staff=True))
+
+            cases = [
+                ('Home page', reverse('payments:home'), None),
+                ('Items API', reverse('payments:api_item_list'), {'limit': 100}),
+                ('Items API (id,name,price)', reverse('payments:api_item_list'),
+                 {'limit': 100, 'fields': 'id,name,price'}),
+                ('Order page', reverse('payments:order_detail', args=[order.id]), None),
+                ('Order API', reverse('payments:api_order_detail', args=[order.id]), None),
+                ('Order API (total)', reverse('payments:api_order_detail', args=[order.id]),
+                 {'fields': 'id,total'}),
+            ]
+            self.stdout.write(f"\n{'Endpoint':<28} {'bytes':>9} {'gzip':>9} {'median':>11} {'304':>11}")
+            for label, url, params in cases:
+                self.measure(client, label, url, params, options['repeat'])
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS('\n✅ Benchmark complete, generated data rolled back'))
+
+    def generate(self, count):
+        Item.objects.bulk_create(
+            Item(name=f'Item {n}', description='Benchmark item ' * 10, price='9.99')
+            for n in range(count)
+        )
+        items = list(Item.objects.all())
+        order = Order.objects.create(
+            discount=Discount.objects.create(name='Bench', code='BENCH10', value=10),
+            tax=Tax.objects.create(name='Bench VAT', rate=20, country='GB'),
+        )
+        order.items.add(*items[:20])
+        return items, order
+
+    def measure(self, client, label, url, params, repeat):
+        """Print body size, gzipped size, median latency and the 304 latency when supported"""
+        response = client.get(url, params)
+        body = response.content
+        etag = response.get('ETag')
+
+        def median_ms(**headers):
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                client.get(url, params, **headers)
+                timings.append((time.perf_counter() - started) * 1000)
+            return statistics.median(timings)
+
+        full = median_ms(HTTP_ACCEPT_ENCODING='gzip')
+        not_modified = f'{median_ms(HTTP_IF_NONE_MATCH=etag):>8.2f} ms' if etag else f"{'-':>11}"
+        self.stdout.write(
+            f'{label:<28} {len(body):>9} {len(gzip.compress(body)):>9} {full:>8.2f} ms {not_modified}'
+        )
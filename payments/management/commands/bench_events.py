@@ -0,0 +1,98 @@
+import asyncio
+import statistics
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from payments.events import EventBroker
+from payments.models import Order
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures order event throughput: transitions written to the outbox '
+        'per second and their delivery to many stream subscribers. '
+        'Generated orders and events are deleted afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=2000, help='Transitions to publish')
+        parser.add_argument('--subscribers', type=int, default=100, help='Concurrent subscribers')
+        parser.add_argument('--batch-size', type=int, default=100, help='Transitions per transaction')
+
+    def handle(self, *args, **options):
+        orders = Order.objects.bulk_create(Order() for _ in range(options['orders']))
+        ids = [order.pk for order in orders]
+        transport = (
+            'LISTEN/NOTIFY' if connection.vendor == 'postgresql'
+            else f'polling every {settings.EVENTS_POLL_INTERVAL} s'
+        )
+        self.stdout.write(
+            f"Publishing {len(ids)} transitions to {options['subscribers']} subscribers "
+            f"on {connection.vendor} ({transport})..."
+        )
+        try:
+            broker = EventBroker()
+            broker.start()
+            asyncio.run(self.run(broker, ids, options['subscribers'], options['batch_size']))
+        finally:
+            # Cascades to the generated events
+            Order.objects.filter(pk__in=ids).delete()
+
+        self.stdout.write(self.style.SUCCESS('\n✅ Benchmark complete, generated data deleted'))
+
+    async def run(self, broker, ids, subscriber_count, batch_size):
+        subscriptions = [broker.subscribe() for _ in range(subscriber_count)]
+        latencies = []
+
+        async def consume(subscription, record_latency):
+            received = 0
+            while received < len(ids):
+                events = await subscription.get(timeout=30)
+                if not events:
+                    raise CommandError('Subscriber stalled: no events for 30 s or overflowed')
+                received += len(events)
+                if record_latency:
+                    now = timezone.now()
+                    latencies.extend(
+                        (now - datetime.fromisoformat(event['created_at'])).total_seconds() * 1000
+                        for event in events
+                    )
+
+        started = time.perf_counter()
+        consumers = asyncio.gather(*(
+            consume(subscription, record_latency=index == 0)
+            for index, subscription in enumerate(subscriptions)
+        ))
+        write_seconds = await asyncio.to_thread(self.publish, ids, batch_size)
+        await consumers
+        total_seconds = time.perf_counter() - started
+
+        deliveries = len(ids) * subscriber_count
+        quantiles = statistics.quantiles(latencies, n=100)
+        self.stdout.write(
+            f'\nWritten:   {len(ids) / write_seconds:>10.0f} events/s '
+            f'({batch_size} transitions per transaction)'
+        )
+        self.stdout.write(
+            f'Delivered: {deliveries / total_seconds:>10.0f} events/s '
+            f'({deliveries} deliveries in {total_seconds:.2f} s)'
+        )
+        self.stdout.write(
+            f'Latency:   p50 {quantiles[49]:.1f} ms, p99 {quantiles[98]:.1f} ms '
+            f'from write to subscriber'
+        )
+
+    def publish(self, ids, batch_size):
+        """Mark the orders paid in batches, one transaction each; returns seconds taken"""
+        started = time.perf_counter()
+        try:
+            for start in range(0, len(ids), batch_size):
+                Order.objects.filter(pk__in=ids[start:start + batch_size]).set_status('paid')
+        finally:
+            connection.close()
+        return time.perf_counter() - started
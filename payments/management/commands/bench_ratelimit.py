@@ -0,0 +1,60 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+
+from payments.ratelimit import TokenBucket, rate_limit
+
+
+class Command(BaseCommand):
+    help = 'Measures the overhead of the checkout rate limiter on the configured cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=10000,
+            help='Number of calls measured per case',
+        )
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        self.stdout.write(f"Cache backend: {settings.CACHES['default']['BACKEND']}")
+        self.stdout.write(f'Iterations: {iterations}\n')
+
+        # Huge buckets so every call takes the "allowed" path
+        bucket = TokenBucket('bench', capacity=iterations * 2, rate=1000)
+        self.report('TokenBucket.consume', iterations, lambda: bucket.consume('client'))
+
+        def view(request, id):
+            return HttpResponse()
+
+        limited_view = rate_limit('item')(view)
+        request = RequestFactory().post('/buy/1/', REMOTE_ADDR='10.0.0.1')
+        unlimited = {'capacity': iterations * 2, 'rate': 1000}
+        with override_settings(BUY_RATE_LIMIT_CLIENT=unlimited, BUY_RATE_LIMIT_TARGET=unlimited):
+            baseline = self.report('View without limiter', iterations, lambda: view(request, id=1))
+            limited = self.report(
+                'View with rate_limit', iterations, lambda: limited_view(request, id=1)
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\n✅ Limiter overhead: {limited - baseline:.1f} µs per request'
+        ))
+        cache.delete_many([
+            'ratelimit:bench:client',
+            'ratelimit:client:10.0.0.1',
+            'ratelimit:target:item:1',
+        ])
+
+    def report(self, label, iterations, func):
+        """Run func `iterations` times and print the mean call time in µs"""
+        started = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        per_call = (time.perf_counter() - started) / iterations * 1e6
+        self.stdout.write(f'  {label:<24} {per_call:8.1f} µs/call')
+        return per_call
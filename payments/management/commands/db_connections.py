@@ -0,0 +1,149 @@
+import statistics
+import threading
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection, connections
+from django.db.backends.signals import connection_created
+
+from payments.models import Item
+
+# Seconds between samples of the server's connection count during the load
+SAMPLE_INTERVAL = 0.05
+
+
+class Command(BaseCommand):
+    help = (
+        'Reports database connection settings, then simulates request load to '
+        'measure connection churn, checkout latency and connections per worker'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Concurrent simulated workers (one thread each, like gunicorn sync workers)',
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=200,
+            help='Requests simulated per worker',
+        )
+
+    def handle(self, *args, **options):
+        self.report_settings()
+
+        workers, requests = options['workers'], options['requests']
+        opened = Counter()
+        lock = threading.Lock()
+        checkout_ms, query_ms = [], []
+        server_connections = []
+        load_done = threading.Event()
+
+        def on_connection_created(sender, connection, **kwargs):
+            with lock:
+                opened[threading.current_thread().name] += 1
+
+        def worker():
+            local_checkout, local_query = [], []
+            for _ in range(requests):
+                # Same lifecycle as a request: request_started/finished both
+                # call close_old_connections(), honouring CONN_MAX_AGE.
+                close_old_connections()
+                started = time.perf_counter()
+                connection.ensure_connection()
+                local_checkout.append((time.perf_counter() - started) * 1000)
+
+                started = time.perf_counter()
+                Item.objects.exists()
+                local_query.append((time.perf_counter() - started) * 1000)
+                close_old_connections()
+
+            with lock:
+                checkout_ms.extend(local_checkout)
+                query_ms.extend(local_query)
+            connections.close_all()
+
+        def sampler():
+            # One connection of its own for the whole run, not counted
+            try:
+                while not load_done.wait(SAMPLE_INTERVAL):
+                    server_connections.append(self.count_server_connections())
+            finally:
+                connections.close_all()
+
+        self.stdout.write(f'\nSimulating {workers} workers x {requests} requests...')
+        connection_created.connect(on_connection_created)
+        try:
+            threads = [
+                threading.Thread(target=worker, name=f'worker-{n}')
+                for n in range(workers)
+            ]
+            sampling = threading.Thread(target=sampler, name='sampler')
+            if connection.vendor == 'postgresql':
+                sampling.start()
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+        finally:
+            load_done.set()
+            if sampling.is_alive():
+                sampling.join()
+            connection_created.disconnect(on_connection_created)
+        opened.pop('sampler', None)
+
+        total = workers * requests
+        self.stdout.write(self.style.SUCCESS(
+            f'\n✅ {total} requests in {elapsed:.2f}s ({total / elapsed:.0f} req/s)'
+        ))
+        self.stdout.write(
+            f'  Connections opened: {sum(opened.values())} '
+            f'({sum(opened.values()) / total:.2%} of requests)'
+        )
+        for name in sorted(opened):
+            self.stdout.write(f'    {name}: {opened[name]}')
+        self.stdout.write(f'  Checkout latency: {self.describe(checkout_ms)}')
+        self.stdout.write(f'  Query latency:    {self.describe(query_ms)}')
+        if server_connections:
+            self.stdout.write(
+                f'  Server connections to this database during load: '
+                f'peak {max(server_connections)}, mean {statistics.mean(server_connections):.1f} '
+                f'({len(server_connections)} samples)'
+            )
+
+    def report_settings(self):
+        db = connection.settings_dict
+        options = db.get('OPTIONS', {})
+        self.stdout.write(f"Engine: {db['ENGINE']}")
+        self.stdout.write(f"CONN_MAX_AGE: {db['CONN_MAX_AGE']}")
+        self.stdout.write(f"CONN_HEALTH_CHECKS: {db['CONN_HEALTH_CHECKS']}")
+        if connection.vendor == 'postgresql':
+            self.stdout.write(
+                f"Server-side cursors: {not db.get('DISABLE_SERVER_SIDE_CURSORS', False)}"
+            )
+            self.stdout.write(f"Native pool: {options.get('pool') or 'disabled'}")
+
+    def count_server_connections(self):
+        """Other connections to the current database, as seen by Postgres"""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT count(*) FROM pg_stat_activity '
+                'WHERE datname = current_database() AND pid <> pg_backend_pid()'
+            )
+            return cursor.fetchone()[0]
+
+    def describe(self, samples):
+        if not samples:
+            return 'n/a'
+        samples = sorted(samples)
+        p95 = samples[min(int(len(samples) * 0.95), len(samples) - 1)]
+        return (
+            f'mean {statistics.mean(samples):.3f} ms, '
+            f'p50 {statistics.median(samples):.3f} ms, p95 {p95:.3f} ms'
+        )
@@ -0,0 +1,247 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from payments.models import Order
+from payments.stripe_client import get_stripe
+
+
+# Payment statuses of a completed session that mark its order as paid
+PAID_PAYMENT_STATUSES = ('paid', 'no_payment_required')
+
+# Slack around each list window to absorb clock skew with Stripe
+WINDOW_SLACK = timedelta(minutes=5)
+
+# Fewer orders than this in a window are cheaper to retrieve one by one
+MIN_LISTED_ORDERS = 2
+
+
+class Command(BaseCommand):
+    help = (
+        'Reconciles pending orders with their Stripe Checkout Sessions, '
+        'marking them paid or cancelled'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.RECONCILE_BATCH_SIZE,
+            help='Number of pending orders selected per keyset batch',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=settings.RECONCILE_CONCURRENCY,
+            help='Maximum number of concurrent Stripe requests',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            default=settings.RECONCILE_CHECKPOINT,
+            help='File used to resume an interrupted run',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Ignore any existing checkpoint and start from the first order',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would change without updating any order',
+        )
+
+    def handle(self, *args, **options):
+        self.stripe = get_stripe()
+
+        batch_size = max(options['batch_size'], 1)
+        concurrency = max(options['concurrency'], 1)
+        checkpoint = options['checkpoint']
+        dry_run = options['dry_run']
+
+        cursor = 0 if options['restart'] else self.load_checkpoint(checkpoint)
+        if cursor:
+            self.stdout.write(f'Resuming after order #{cursor}')
+
+        stats = {'scanned': 0, 'paid': 0, 'cancelled': 0, 'open': 0, 'missing': 0}
+        missing = []
+        started = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            while True:
+                batch = list(
+                    Order.objects
+                    .filter(status='pending', id__gt=cursor)
+                    .exclude(stripe_session_id__isnull=True)
+                    .exclude(stripe_session_id='')
+                    .order_by('id')
+                    .values('id', 'stripe_session_id', 'created_at')[:batch_size]
+                )
+                if not batch:
+                    break
+
+                sessions = self.fetch_sessions(executor, batch)
+                paid_ids, cancelled_ids = [], []
+                for order in batch:
+                    session = sessions.get(order['stripe_session_id'])
+                    if session is None:
+                        stats['missing'] += 1
+                        missing.append(order['id'])
+                    elif (session['status'] == 'complete'
+                          and session['payment_status'] in PAID_PAYMENT_STATUSES):
+                        paid_ids.append(order['id'])
+                    elif session['status'] == 'expired':
+                        cancelled_ids.append(order['id'])
+                    else:
+                        stats['open'] += 1
+
+                stats['scanned'] += len(batch)
+                stats['paid'] += self.update_status(paid_ids, 'paid', dry_run)
+                stats['cancelled'] += self.update_status(cancelled_ids, 'cancelled', dry_run)
+
+                cursor = batch[-1]['id']
+                if not dry_run:
+                    self.save_checkpoint(checkpoint, cursor)
+                self.stdout.write(
+                    f'  Batch up to order #{cursor}: {len(paid_ids)} paid, '
+                    f'{len(cancelled_ids)} cancelled'
+                )
+
+        if not dry_run:
+            self.clear_checkpoint(checkpoint)
+
+        elapsed = time.monotonic() - started
+        throughput = stats['scanned'] / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"\n✅ Reconciled {stats['scanned']} orders in {elapsed:.2f}s "
+            f"({throughput:.1f} orders/s)"
+        ))
+        self.stdout.write(f"  Paid: {stats['paid']}")
+        self.stdout.write(f"  Cancelled: {stats['cancelled']}")
+        self.stdout.write(f"  Still open: {stats['open']}")
+        if missing:
+            self.stdout.write(self.style.WARNING(
+                f"  Sessions not found on Stripe: {stats['missing']}"
+            ))
+            if options['verbosity'] > 1:
+                self.stdout.write(f"  Orders: {', '.join(f'#{pk}' for pk in missing)}")
+
+    def fetch_sessions(self, executor, batch):
+        """
+        Find the Checkout Sessions of a batch of orders.
+
+        Sessions are normally created soon after their order, so orders
+        created close together are grouped into windows listed in parallel
+        (see list_windows). Sessions those lists did not return, because
+        their order was alone in its window or checked out later, are
+        retrieved one by one.
+        """
+        wanted = {order['stripe_session_id'] for order in batch}
+        sessions = {}
+        for found in executor.map(lambda window: self.list_window(*window), self.list_windows(batch)):
+            sessions.update(found)
+
+        remaining = [session_id for session_id in wanted if session_id not in sessions]
+        for session_id, session in zip(remaining, executor.map(self.retrieve, remaining)):
+            if session is not None:
+                sessions[session_id] = session
+        return sessions
+
+    def list_windows(self, batch):
+        """
+        Return (gte, lt, session_ids) of the windows worth listing: orders
+        created within RECONCILE_CLUSTER_SPAN of the first order of their
+        cluster share a window running until RECONCILE_SESSION_WINDOW after
+        the last one. Clusters of fewer than MIN_LISTED_ORDERS are skipped,
+        and overlapping or adjacent windows are merged so that no session
+        is listed twice.
+        """
+        span = timedelta(seconds=settings.RECONCILE_CLUSTER_SPAN)
+        clusters = []
+        for order in sorted(batch, key=lambda order: order['created_at']):
+            if clusters and order['created_at'] - clusters[-1][0]['created_at'] <= span:
+                clusters[-1].append(order)
+            else:
+                clusters.append([order])
+
+        session_window = timedelta(seconds=settings.RECONCILE_SESSION_WINDOW)
+        windows = []
+        for cluster in clusters:
+            if len(cluster) < MIN_LISTED_ORDERS:
+                continue
+            gte = int((cluster[0]['created_at'] - WINDOW_SLACK).timestamp())
+            lt = int((cluster[-1]['created_at'] + session_window + WINDOW_SLACK).timestamp()) + 1
+            session_ids = {order['stripe_session_id'] for order in cluster}
+            # Clusters are in creation order, so only the last window can overlap
+            if windows and gte <= windows[-1][1]:
+                previous_gte, previous_lt, previous_ids = windows[-1]
+                windows[-1] = (previous_gte, max(previous_lt, lt), previous_ids | session_ids)
+            else:
+                windows.append((gte, lt, session_ids))
+        return windows
+
+    def list_window(self, gte, lt, wanted):
+        """
+        Return the wanted sessions created in [gte, lt), paging no further
+        than needed to find them all
+        """
+        found = {}
+        page = self.stripe.checkout.Session.list(created={'gte': gte, 'lt': lt}, limit=100)
+        for session in page.auto_paging_iter():
+            if session.id in wanted:
+                found[session.id] = self.session_state(session)
+                if len(found) == len(wanted):
+                    break
+        return found
+
+    def retrieve(self, session_id):
+        """Return one session's state, or None if Stripe does not know it"""
+        try:
+            session = self.stripe.checkout.Session.retrieve(session_id)
+        except self.stripe.error.InvalidRequestError as e:
+            if e.http_status == 404:
+                return None
+            raise
+        return self.session_state(session)
+
+    def session_state(self, session):
+        return {
+            'status': session.get('status'),
+            'payment_status': session.get('payment_status'),
+        }
+
+    def update_status(self, ids, status, dry_run):
+        """
+        Move still-pending orders to a new status in a single UPDATE,
+        recording their order events
+        """
+        if not ids:
+            return 0
+        if dry_run:
+            return len(ids)
+        return Order.objects.filter(id__in=ids, status='pending').set_status(status)
+
+    def load_checkpoint(self, path):
+        try:
+            with open(path) as fh:
+                return int(json.load(fh)['cursor'])
+        except (OSError, ValueError, KeyError, TypeError):
+            return 0
+
+    def save_checkpoint(self, path, cursor):
+        # Write then rename so an interruption never leaves a truncated file
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as fh:
+            json.dump({'cursor': cursor}, fh)
+        os.replace(tmp_path, path)
+
+    def clear_checkpoint(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
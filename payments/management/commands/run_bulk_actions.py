@@ -0,0 +1,41 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from payments import bulk_actions
+
+
+class Command(BaseCommand):
+    help = (
+        'Processes admin bulk actions queued for the background, and resumes '
+        'jobs whose worker stopped'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process the jobs waiting now and exit',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=settings.BULK_ACTION_POLL_INTERVAL,
+            help='Seconds between checks for new jobs',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                count = bulk_actions.run_pending()
+            except Exception as e:
+                if options['once']:
+                    raise
+                self.stderr.write(f'Bulk action processing failed: {e}')
+            else:
+                if count or options['once']:
+                    self.stdout.write(f'Processed {count} bulk action jobs')
+            if options['once']:
+                break
+            time.sleep(options['interval'])
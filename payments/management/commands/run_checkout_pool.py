@@ -0,0 +1,44 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from payments import checkout_pool
+
+
+class Command(BaseCommand):
+    help = 'Keeps the pool of pre-created checkout sessions for hot items filled'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run a single maintenance pass and exit',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=settings.CHECKOUT_POOL_REFILL_INTERVAL,
+            help='Seconds between maintenance passes',
+        )
+
+    def handle(self, *args, **options):
+        checkout_pool.check_settings()
+        with ThreadPoolExecutor(max_workers=settings.CHECKOUT_POOL_CONCURRENCY) as executor:
+            while True:
+                try:
+                    result = checkout_pool.run_cycle(executor)
+                except Exception as e:
+                    if options['once']:
+                        raise
+                    self.stderr.write(f'Pool maintenance failed: {e}')
+                else:
+                    if any(result.values()) or options['once']:
+                        self.stdout.write(
+                            f"Created {result['created']}, retired {result['retired']}, "
+                            f"pruned {result['pruned']} pooled sessions"
+                        )
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
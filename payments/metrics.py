@@ -0,0 +1,65 @@
+"""
+Application counters kept in the default cache and exposed in Prometheus
+text format. The totals are only shared by every gunicorn worker and the
+run_checkout_pool process when that cache is shared (REDIS_URL); with the
+default per-process memory cache each process counts on its own.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+# Cache backends whose data stays in one process
+PER_PROCESS_CACHES = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+COUNTERS = {
+    'checkout_pool_hits_total': 'Checkouts served from the session pool',
+    'checkout_pool_misses_total': 'Checkouts of pooled items that had to create a session',
+    'checkout_pool_latency_saved_ms_total': 'Stripe session creation time saved by pool hits',
+    'checkout_pool_sessions_created_total': 'Sessions created to replenish the pool',
+    'checkout_pool_sessions_retired_total': 'Unclaimed pool sessions retired before expiring',
+}
+
+
+def is_shared():
+    """Whether the counters are shared between processes"""
+    return settings.CACHES['default']['BACKEND'] not in PER_PROCESS_CACHES
+
+
+def _key(name):
+    return f'metrics:{name}'
+
+
+def increment(name, value=1):
+    """Add `value` to a counter declared in COUNTERS"""
+    key = _key(name)
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key, value)
+    except ValueError:
+        # Evicted between add() and incr()
+        cache.set(key, value, timeout=None)
+
+
+def get_counters():
+    """Return the current value of every counter"""
+    values = cache.get_many([_key(name) for name in COUNTERS])
+    return {name: values.get(_key(name), 0) for name in COUNTERS}
+
+
+def render_prometheus():
+    """Render all counters plus derived gauges in Prometheus text format"""
+    counters = get_counters()
+    lines = []
+    for name, description in COUNTERS.items():
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} counter')
+        lines.append(f'{name} {counters[name]}')
+
+    lookups = counters['checkout_pool_hits_total'] + counters['checkout_pool_misses_total']
+    hit_ratio = counters['checkout_pool_hits_total'] / lookups if lookups else 0
+    lines.append('# HELP checkout_pool_hit_ratio Share of pooled-item checkouts served from the pool')
+    lines.append('# TYPE checkout_pool_hit_ratio gauge')
+    lines.append(f'checkout_pool_hit_ratio {hit_ratio:.4f}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.9 on 2026-10-19 03:51
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='checkout_pool_size',
+            field=models.PositiveIntegerField(default=0, help_text='Pre-created checkout sessions kept ready for this item (0 disables the pool)'),
+        ),
+        migrations.CreateModel(
+            name='PooledCheckoutSession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stripe_session_id', models.CharField(max_length=255, unique=True)),
+                ('item_updated_at', models.DateTimeField(help_text='Item version the session was priced from')),
+                ('expires_at', models.DateTimeField(help_text='When Stripe expires the session')),
+                ('creation_ms', models.PositiveIntegerField(default=0, help_text='Time Stripe took to create the session')),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pooled_sessions', to='payments.item')),
+            ],
+            options={
+                'verbose_name': 'Pooled Checkout Session',
+                'verbose_name_plural': 'Pooled Checkout Sessions',
+                'ordering': ['expires_at'],
+                'indexes': [models.Index(fields=['item', 'claimed_at', 'expires_at'], name='payments_po_item_id_6b5d81_idx')],
+            },
+        ),
+    ]
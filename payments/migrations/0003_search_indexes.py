@@ -0,0 +1,68 @@
+# Generated by Django 4.2.9 on 2026-10-19 03:56
+
+from django.db import migrations, models
+
+
+POSTGRES_FORWARD = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS payments_item_name_trgm '
+    'ON payments_item USING gin (name gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS payments_item_description_trgm '
+    'ON payments_item USING gin (description gin_trgm_ops)',
+]
+
+POSTGRES_REVERSE = [
+    'DROP INDEX IF EXISTS payments_item_description_trgm',
+    'DROP INDEX IF EXISTS payments_item_name_trgm',
+]
+
+# External-content FTS5 table kept in sync with payments_item by triggers
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS payments_item_fts USING fts5("
+    "name, description, content='payments_item', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS payments_item_fts_ai AFTER INSERT ON payments_item BEGIN "
+    "INSERT INTO payments_item_fts(rowid, name, description) "
+    "VALUES (new.id, new.name, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS payments_item_fts_ad AFTER DELETE ON payments_item BEGIN "
+    "INSERT INTO payments_item_fts(payments_item_fts, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS payments_item_fts_au AFTER UPDATE ON payments_item BEGIN "
+    "INSERT INTO payments_item_fts(payments_item_fts, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); "
+    "INSERT INTO payments_item_fts(rowid, name, description) "
+    "VALUES (new.id, new.name, new.description); END",
+    "INSERT INTO payments_item_fts(payments_item_fts) VALUES ('rebuild')",
+]
+
+SQLITE_REVERSE = [
+    'DROP TRIGGER IF EXISTS payments_item_fts_au',
+    'DROP TRIGGER IF EXISTS payments_item_fts_ad',
+    'DROP TRIGGER IF EXISTS payments_item_fts_ai',
+    'DROP TABLE IF EXISTS payments_item_fts',
+]
+
+
+def run_for_vendor(statements):
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0002_checkout_pool'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='order',
+            name='stripe_session_id',
+            field=models.CharField(blank=True, db_index=True, max_length=255, null=True),
+        ),
+        migrations.RunPython(
+            run_for_vendor({'postgresql': POSTGRES_FORWARD, 'sqlite': SQLITE_FORWARD}),
+            run_for_vendor({'postgresql': POSTGRES_REVERSE, 'sqlite': SQLITE_REVERSE}),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.9 on 2026-10-19 03:57
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('payments', '0003_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BulkActionJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(help_text='Bulk operation name', max_length=100)),
+                ('model', models.CharField(help_text='Model the action was applied to', max_length=100)),
+                ('total', models.PositiveIntegerField(default=0, help_text='Objects selected')),
+                ('processed', models.PositiveIntegerField(default=0, help_text='Objects processed so far')),
+                ('updated', models.PositiveIntegerField(default=0, help_text='Rows actually changed')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='running', max_length=10)),
+                ('error', models.TextField(blank=True)),
+                ('object_ids', models.JSONField(default=list, help_text='Selected primary keys, in processing order')),
+                ('heartbeat_at', models.DateTimeField(blank=True, help_text='Last progress reported by the process running the job', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bulk_action_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Bulk Action Job',
+                'verbose_name_plural': 'Bulk Action Jobs',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
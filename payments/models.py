@@ -1,4 +1,6 @@
-from django.db import models
+from django.conf import settings
+from django.db import connections, models, transaction
+from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
 
 
@@ -25,6 +27,10 @@ class Item(models.Model):
         default='usd',
         help_text="Currency for this item"
     )
+    checkout_pool_size = models.PositiveIntegerField(
+        default=0,
+        help_text="Pre-created checkout sessions kept ready for this item (0 disables the pool)"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -117,9 +123,31 @@ class Tax(models.Model):
         return (amount * self.rate) / 100
 
 
+class OrderQuerySet(models.QuerySet):
+
+    def set_status(self, status, **fields):
+        """
+        Move the selected orders to `status` set-wise, recording an
+        OrderEvent per order that actually changes in the same transaction.
+        Returns the number of orders updated.
+        """
+        with transaction.atomic(using=self.db):
+            changes = list(
+                self.exclude(status=status).order_by().select_for_update().values_list('pk', 'status')
+            )
+            if not changes:
+                return 0
+            updated = Order.objects.using(self.db).filter(
+                pk__in=[pk for pk, _ in changes],
+            ).update(status=status, updated_at=timezone.now(), **fields)
+            OrderEvent.record(changes, status, using=self.db)
+        return updated
+
+
 class Order(models.Model):
     """
     Represents an order containing multiple items.
+    Status transitions are recorded as OrderEvents (see OrderQuerySet.set_status).
     """
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -148,10 +176,12 @@ class Order(models.Model):
         choices=STATUS_CHOICES,
         default='pending'
     )
-    stripe_session_id = models.CharField(max_length=255, blank=True, null=True)
+    stripe_session_id = models.CharField(max_length=255, blank=True, null=True, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = OrderQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
         verbose_name = 'Order'
@@ -160,6 +190,33 @@ class Order(models.Model):
     def __str__(self):
         return f"Order #{self.id} - {self.status}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Status as stored, to detect transitions on save()
+        instance._stored_status = instance.__dict__.get('status')
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        if fields is None or 'status' in fields:
+            self._stored_status = self.__dict__.get('status')
+
+    def save(self, *args, **kwargs):
+        """Save, recording an OrderEvent when the status changed"""
+        previous = getattr(self, '_stored_status', 'pending')
+        update_fields = kwargs.get('update_fields')
+        saves_status = update_fields is None or 'status' in update_fields
+        if previous is not None and self.status != previous and saves_status:
+            using = kwargs.get('using') or self._state.db or 'default'
+            with transaction.atomic(using=using):
+                super().save(*args, **kwargs)
+                OrderEvent.record([(self.pk, previous)], self.status, using=using)
+        else:
+            super().save(*args, **kwargs)
+        if saves_status:
+            self._stored_status = self.status
+
     def get_subtotal(self):
         """Calculate subtotal (sum of all items)"""
         return sum(item.price for item in self.items.all())
@@ -179,12 +236,166 @@ class Order(models.Model):
 
     def get_total(self):
         """Calculate total amount (subtotal - discount + tax)"""
+        return self.get_totals()['total']
+
+    def get_totals(self):
+        """Calculate subtotal, discount, tax and total from a single items query"""
         subtotal = self.get_subtotal()
-        discount = self.get_discount_amount()
-        tax = self.get_tax_amount()
-        return subtotal - discount + tax
+        discount = 0
+        if self.discount and self.discount.active:
+            discount = self.discount.calculate_discount(subtotal)
+        tax = 0
+        if self.tax and self.tax.active:
+            tax = self.tax.calculate_tax(subtotal - discount)
+        return {
+            'subtotal': subtotal,
+            'discount': discount,
+            'tax': tax,
+            'total': subtotal - discount + tax,
+        }
 
     def get_currency(self):
         """Get currency from first item (assumes all items same currency)"""
         first_item = self.items.first()
-        return first_item.currency if first_item else 'usd'
\ No newline at end of file
+        return first_item.currency if first_item else 'usd'
+
+
+class PooledCheckoutSession(models.Model):
+    """
+    A Stripe Checkout Session created ahead of time for a hot item, handed
+    out to the next buyer instead of creating one on click.
+    """
+    item = models.ForeignKey(
+        Item,
+        on_delete=models.CASCADE,
+        related_name='pooled_sessions'
+    )
+    stripe_session_id = models.CharField(max_length=255, unique=True)
+    item_updated_at = models.DateTimeField(
+        help_text="Item version the session was priced from"
+    )
+    expires_at = models.DateTimeField(help_text="When Stripe expires the session")
+    creation_ms = models.PositiveIntegerField(
+        default=0,
+        help_text="Time Stripe took to create the session"
+    )
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['expires_at']
+        verbose_name = 'Pooled Checkout Session'
+        verbose_name_plural = 'Pooled Checkout Sessions'
+        indexes = [
+            models.Index(fields=['item', 'claimed_at', 'expires_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.stripe_session_id} ({self.item_id})"
+
+
+class BulkActionJob(models.Model):
+    """
+    Audit record and progress of an admin bulk action, applied to the
+    selection with set-wise UPDATEs rather than per-object saves.
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    action = models.CharField(max_length=100, help_text="Bulk operation name")
+    model = models.CharField(max_length=100, help_text="Model the action was applied to")
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='bulk_action_jobs'
+    )
+    total = models.PositiveIntegerField(default=0, help_text="Objects selected")
+    processed = models.PositiveIntegerField(default=0, help_text="Objects processed so far")
+    updated = models.PositiveIntegerField(default=0, help_text="Rows actually changed")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='running')
+    error = models.TextField(blank=True)
+    object_ids = models.JSONField(default=list, help_text="Selected primary keys, in processing order")
+    heartbeat_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Last progress reported by the process running the job"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Bulk Action Job'
+        verbose_name_plural = 'Bulk Action Jobs'
+
+    def __str__(self):
+        return f"{self.action} on {self.total} {self.model} - {self.status}"
+
+    def get_progress(self):
+        """Returns the share of the selection processed, in percent"""
+        if not self.total:
+            return 100
+        return int(self.processed * 100 / self.total)
+
+
+class OrderEvent(models.Model):
+    """
+    Outbox of order status transitions, written in the same transaction as
+    the transition. The auto-incrementing id is the cursor consumers resume
+    from (see payments.events).
+    """
+    # Postgres channel notified with the newest event id on commit
+    CHANNEL = 'order_events'
+    # Advisory lock serializing outbox writes so ids commit in order
+    LOCK_ID = 0x6f726465
+
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='events')
+    old_status = models.CharField(max_length=20)
+    new_status = models.CharField(max_length=20)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        verbose_name = 'Order Event'
+        verbose_name_plural = 'Order Events'
+
+    def __str__(self):
+        return f"Order #{self.order_id}: {self.old_status} -> {self.new_status}"
+
+    @classmethod
+    def record(cls, changes, status, using='default'):
+        """
+        Write events for `changes`, a list of (order id, old status), and
+        notify listeners once the surrounding transaction commits.
+        Must be called inside that transaction.
+        """
+        connection = connections[using]
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                # Without it a later id could commit first and be skipped
+                # by a consumer that already moved its cursor past it
+                cursor.execute('SELECT pg_advisory_xact_lock(%s)', [cls.LOCK_ID])
+        events = cls.objects.using(using).bulk_create(
+            cls(order_id=pk, old_status=old_status or '', new_status=status)
+            for pk, old_status in changes
+        )
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                # Delivered by Postgres at commit, dropped on rollback
+                cursor.execute('SELECT pg_notify(%s, %s)', [cls.CHANNEL, str(events[-1].pk)])
+        return events
+
+    def as_dict(self):
+        return {
+            'id': self.id,
+            'order_id': self.order_id,
+            'old_status': self.old_status,
+            'status': self.new_status,
+            'created_at': self.created_at.isoformat(),
+        }
@@ -0,0 +1,170 @@
+"""
+Per-view query budgets, enforced in development and tests.
+
+Function views declare a budget with `@query_budget(queries)`, ModelAdmins
+with `@admin_query_budget(changelist=..., change=...)`. QueryBudgetMiddleware
+counts each request's queries with `connection.execute_wrapper` and, when a
+view runs more queries than its budget or repeats the same SQL (the usual
+sign of an N+1 query), raises QueryBudgetExceeded or logs a warning
+(QUERY_BUDGET_ACTION). Per-view totals are kept in `stats` for the report
+printed by payments.testing.QueryBudgetTestMixin.
+"""
+import asyncio
+import logging
+import time
+from collections import Counter, namedtuple
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+# Most queries a view may run, and how many times SQL may be repeated
+Budget = namedtuple('Budget', ['queries', 'duplicates'])
+
+SAVEPOINT_STATEMENTS = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+
+# View name -> {'requests', 'queries', 'max_queries', 'duplicates', 'time'}
+stats = {}
+
+
+class QueryBudgetExceeded(Exception):
+    """A view ran more queries than its budget, or repeated the same SQL"""
+
+
+def query_budget(queries, duplicates=0):
+    """Declare the most queries a function view may run per request"""
+    def decorator(view_func):
+        view_func.query_budget = Budget(queries, duplicates)
+        return view_func
+    return decorator
+
+
+def admin_query_budget(duplicates=0, **views):
+    """
+    Declare query budgets for a ModelAdmin's views by name
+    (changelist, add, change, delete, history)
+    """
+    def decorator(model_admin_class):
+        model_admin_class.query_budgets = {
+            name: Budget(queries, duplicates) for name, queries in views.items()
+        }
+        return model_admin_class
+    return decorator
+
+
+def get_budget(request, view_func):
+    """Return the view's name and its Budget, or None when it has none"""
+    match = request.resolver_match
+    model_admin = getattr(view_func, 'model_admin', None)
+    if model_admin is not None:
+        opts = model_admin.model._meta
+        view = match.url_name.removeprefix(f'{opts.app_label}_{opts.model_name}_')
+        return f'admin:{match.url_name}', getattr(model_admin, 'query_budgets', {}).get(view)
+    return match.view_name, getattr(view_func, 'query_budget', None)
+
+
+class QueryRecorder:
+    """
+    execute_wrapper counting queries, their time and repeated SQL.
+    Savepoints are not counted, so that budgets hold both inside and outside
+    the transaction each test runs in.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+        self.sql = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        if sql.startswith(SAVEPOINT_STATEMENTS):
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.time += time.perf_counter() - started
+            self.count += 1
+            self.sql[sql] += 1
+
+    @property
+    def duplicates(self):
+        return sum(count - 1 for count in self.sql.values())
+
+    def repeated(self):
+        return [(sql, count) for sql, count in self.sql.most_common() if count > 1]
+
+
+def record(name, recorder):
+    entry = stats.setdefault(name, {
+        'requests': 0, 'queries': 0, 'max_queries': 0, 'duplicates': 0, 'time': 0.0,
+    })
+    entry['requests'] += 1
+    entry['queries'] += recorder.count
+    entry['max_queries'] = max(entry['max_queries'], recorder.count)
+    entry['duplicates'] += recorder.duplicates
+    entry['time'] += recorder.time
+
+
+def format_report(limit=None):
+    """Views ranked by their most queries in a request, then total DB time"""
+    rows = sorted(
+        stats.items(),
+        key=lambda row: (row[1]['max_queries'], row[1]['time']),
+        reverse=True,
+    )[:limit]
+    lines = [f"{'View':<45} {'requests':>8} {'max':>5} {'avg':>6} {'repeats':>7} {'DB ms':>8}"]
+    for name, entry in rows:
+        lines.append(
+            f"{name[:45]:<45} {entry['requests']:>8} {entry['max_queries']:>5} "
+            f"{entry['queries'] / entry['requests']:>6.1f} {entry['duplicates']:>7} "
+            f"{entry['time'] * 1000:>8.1f}"
+        )
+    return '\n'.join(lines)
+
+
+class QueryBudgetMiddleware:
+    """Enforce query budgets when QUERY_BUDGET_ENABLED (defaults to DEBUG)"""
+
+    def __init__(self, get_response):
+        if not settings.QUERY_BUDGET_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        view = getattr(request, 'query_budget_view', None)
+        if view is not None:
+            self.check(request, *view, recorder)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Async views (the event stream) run their queries outside this thread
+        if not asyncio.iscoroutinefunction(view_func):
+            request.query_budget_view = get_budget(request, view_func)
+
+    def check(self, request, name, budget, recorder):
+        record(name, recorder)
+        if budget is None:
+            budget = Budget(None, settings.QUERY_BUDGET_DUPLICATES)
+
+        problems = []
+        if budget.queries is not None and recorder.count > budget.queries:
+            problems.append(f'{recorder.count} queries, budget is {budget.queries}')
+        if recorder.duplicates > budget.duplicates:
+            repeated = '\n'.join(
+                f'  {count}x {sql[:200]}' for sql, count in recorder.repeated()
+            )
+            problems.append(
+                f'{recorder.duplicates} repeated queries, {budget.duplicates} allowed:\n{repeated}'
+            )
+        if not problems:
+            return
+
+        message = f"{request.method} {request.path} ({name}): {'; '.join(problems)}"
+        if settings.QUERY_BUDGET_ACTION == 'raise':
+            raise QueryBudgetExceeded(message)
+        logger.warning('Query budget exceeded: %s', message)
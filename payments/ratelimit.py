@@ -0,0 +1,102 @@
+"""
+Token-bucket rate limiting for the checkout endpoints.
+
+Bucket state lives in the default cache so that limits are shared by every
+gunicorn worker when the cache is shared (Redis, see REDIS_URL in settings).
+"""
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+
+
+class TokenBucket:
+    """
+    A bucket holding up to `capacity` tokens, refilled at `rate` tokens per
+    second. Each request consumes one token.
+
+    The read-modify-write on the cache is not atomic, so concurrent requests
+    may occasionally be granted a few extra tokens; this is acceptable for
+    protecting the Stripe quota and avoids a round-trip per lock.
+    """
+
+    def __init__(self, name, capacity, rate, backend=None):
+        self.name = name
+        self.capacity = capacity
+        self.rate = rate
+        self.cache = backend or cache
+        # After this long an untouched bucket is full again, so it can expire
+        self.timeout = math.ceil(capacity / rate) + 1
+
+    def consume(self, key):
+        """
+        Take a token for `key`. Returns 0 when the request is allowed,
+        otherwise the number of seconds until a token becomes available.
+        """
+        cache_key = f'ratelimit:{self.name}:{key}'
+        now = time.time()
+        state = self.cache.get(cache_key)
+        if state is None:
+            tokens = self.capacity
+        else:
+            tokens, updated = state
+            tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+
+        if tokens >= 1:
+            self.cache.set(cache_key, (tokens - 1, now), self.timeout)
+            return 0
+        return (1 - tokens) / self.rate
+
+
+def get_client_ip(request):
+    """
+    Return the client address. Behind a proxy (Railway, Heroku, nginx) the
+    proxy appends the real client to X-Forwarded-For, so the last entry is the
+    only one that can be trusted.
+    """
+    if settings.RATE_LIMIT_USE_X_FORWARDED_FOR:
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+        if forwarded:
+            return forwarded.split(',')[-1].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def get_buckets():
+    """Build the client and target buckets from settings"""
+    client = settings.BUY_RATE_LIMIT_CLIENT
+    target = settings.BUY_RATE_LIMIT_TARGET
+    return (
+        TokenBucket('client', client['capacity'], client['rate']),
+        TokenBucket('target', target['capacity'], target['rate']),
+    )
+
+
+def rate_limit(target):
+    """
+    Limit a view both per client and per purchased object, e.g.
+    `@rate_limit('item')` on a view taking an `id` argument.
+
+    Rejected requests get a 429 response with a Retry-After header.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if settings.RATE_LIMIT_ENABLED:
+                client_bucket, target_bucket = get_buckets()
+                retry_after = (
+                    client_bucket.consume(get_client_ip(request))
+                    or target_bucket.consume(f"{target}:{kwargs.get('id')}")
+                )
+                if retry_after:
+                    response = JsonResponse(
+                        {'error': 'Too many requests, please try again later'},
+                        status=429,
+                    )
+                    response['Retry-After'] = str(math.ceil(retry_after))
+                    return response
+            return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
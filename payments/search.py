@@ -0,0 +1,88 @@
+"""
+Index-friendly search over items and orders.
+
+Django's default admin search turns every term into OR'd `icontains`
+clauses, i.e. LIKE '%term%' scans over the whole table. These helpers route
+each query shape to a lookup an index can serve:
+
+- Item text: ILIKE per word on Postgres, served by the trigram GIN indexes
+  on name and description, and an FTS5 table on SQLite (see migration 0003).
+- Order IDs: exact primary key lookups.
+- Stripe session IDs: exact or prefix match on an indexed column.
+"""
+import re
+
+from django.db import connection
+from django.db.models import BigIntegerField, F, Lookup, Q
+from django.db.models.expressions import RawSQL
+
+SESSION_ID_PREFIX = 'cs_'
+
+FTS_TOKEN_RE = re.compile(r'\w+')
+
+
+class ILike(Lookup):
+    """
+    `lhs ILIKE rhs` on the bare column. `icontains` compiles to
+    UPPER(col::text) LIKE UPPER(...) on Postgres, which gin_trgm_ops
+    indexes on the column cannot serve.
+    """
+    lookup_name = 'ilike'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} ILIKE {rhs}', [*lhs_params, *rhs_params]
+
+
+def search_items(queryset, term):
+    """Filter items whose name or description match every word of `term`"""
+    words = term.split()
+    if not words:
+        return queryset
+
+    if connection.vendor == 'sqlite':
+        # Every word as a prefix token, e.g. "wire mou" -> "wire"* "mou"*
+        tokens = FTS_TOKEN_RE.findall(term)
+        if not tokens:
+            return queryset.none()
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        return queryset.filter(pk__in=RawSQL(
+            'SELECT rowid FROM payments_item_fts WHERE payments_item_fts MATCH %s',
+            [match],
+        ))
+
+    for word in words:
+        pattern = f'%{connection.ops.prep_for_like_query(word)}%'
+        queryset = queryset.filter(
+            Q(ILike(F('name'), pattern)) | Q(ILike(F('description'), pattern))
+        )
+    return queryset
+
+
+def search_orders(queryset, term):
+    """
+    Look orders up by ID ("42" or "#42") or by Stripe session ID (full ID or
+    a prefix such as "cs_test_a1b2"). Other terms match nothing.
+    """
+    term = term.strip()
+    order_id = term.lstrip('#')
+    if order_id.isdecimal():
+        order_id = int(order_id)
+        # Beyond the BigAutoField range: match nothing rather than overflow the driver
+        if order_id > BigIntegerField.MAX_BIGINT:
+            return queryset.none()
+        return queryset.filter(pk=order_id)
+
+    if term.startswith(SESSION_ID_PREFIX):
+        if connection.vendor == 'sqlite':
+            # SQLite only uses an index for LIKE with case-sensitive
+            # collation, so express the prefix as a range instead
+            return queryset.filter(
+                stripe_session_id__gte=term,
+                stripe_session_id__lt=term + '\U0010ffff',
+            )
+        # Served by the varchar_pattern_ops index Django adds on Postgres
+        return queryset.filter(stripe_session_id__startswith=term)
+
+    return queryset.none()
@@ -0,0 +1,51 @@
+// Checkout button shared by the item and order pages.
+// The button carries the checkout URL and Stripe key as data attributes:
+// <button id="buy-button" data-checkout-url="..." data-stripe-key="..." data-csrf-token="...">
+(function() {
+    var buyButton = document.getElementById('buy-button');
+    var loading = document.getElementById('loading');
+    var errorDiv = document.getElementById('error');
+    var stripe = Stripe(buyButton.dataset.stripeKey);
+    // One key per page view, so retries and double clicks reuse the same session
+    var idempotencyKey = (window.crypto && crypto.randomUUID)
+        ? crypto.randomUUID()
+        : Date.now().toString(36) + '-' + Math.random().toString(36).slice(2);
+
+    buyButton.addEventListener('click', function() {
+        // Disable button and show loading
+        buyButton.disabled = true;
+        loading.style.display = 'block';
+        errorDiv.style.display = 'none';
+
+        // Create checkout session
+        fetch(buyButton.dataset.checkoutUrl, {
+            method: 'POST',
+            headers: {
+                'X-CSRFToken': buyButton.dataset.csrfToken,
+                'Idempotency-Key': idempotencyKey,
+            },
+        })
+        .then(function(response) {
+            return response.json();
+        })
+        .then(function(data) {
+            if (data.error) {
+                throw new Error(data.error);
+            }
+            // Redirect to Stripe Checkout
+            return stripe.redirectToCheckout({ sessionId: data.id });
+        })
+        .then(function(result) {
+            if (result.error) {
+                throw new Error(result.error.message);
+            }
+        })
+        .catch(function(error) {
+            // Show error
+            errorDiv.textContent = 'Error: ' + error.message;
+            errorDiv.style.display = 'block';
+            buyButton.disabled = false;
+            loading.style.display = 'none';
+        });
+    });
+})();
@@ -0,0 +1,21 @@
+"""
+Lazily loaded Stripe SDK.
+
+Importing `stripe` takes a large share of worker startup, and most
+requests (home, item and order pages, static files) never talk to Stripe,
+so the SDK is only imported the first time it is needed.
+"""
+from django.conf import settings
+
+
+def get_stripe():
+    """
+    Return the `stripe` module configured from settings. The import is done
+    once per process; the settings are re-applied on every call so that
+    overrides (e.g. in tests) are picked up.
+    """
+    import stripe
+
+    stripe.api_key = settings.STRIPE_SECRET_KEY
+    stripe.api_base = settings.STRIPE_API_BASE
+    return stripe
@@ -0,0 +1,38 @@
+"""
+Test helpers.
+
+QueryBudgetTestMixin makes a TestCase's requests fail when a view exceeds
+its query budget. Run the suite with QUERY_BUDGET_REPORT=True to print the
+views it exercised, ranked by queries and DB time, when the run ends:
+
+    QUERY_BUDGET_REPORT=True python manage.py test
+"""
+import atexit
+import sys
+
+from django.conf import settings
+from django.test import override_settings
+
+from . import query_budget
+
+_report_registered = False
+
+
+def print_report():
+    if query_budget.stats:
+        sys.stderr.write(f'\nQuery budget report\n{query_budget.format_report()}\n')
+
+
+class QueryBudgetTestMixin:
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        enforced = override_settings(QUERY_BUDGET_ENABLED=True, QUERY_BUDGET_ACTION='raise')
+        enforced.enable()
+        cls.addClassCleanup(enforced.disable)
+
+        global _report_registered
+        if settings.QUERY_BUDGET_REPORT and not _report_registered:
+            atexit.register(print_report)
+            _report_registered = True
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, events, views
 
 app_name = 'payments'
 
@@ -18,4 +18,16 @@ urlpatterns = [
     # Success and cancel pages
     path('success/', views.success, name='success'),
     path('cancel/', views.cancel, name='cancel'),
+    
+    # JSON API
+    path('api/items/', api.item_list, name='api_item_list'),
+    path('api/items/<int:id>/', api.item_detail, name='api_item_detail'),
+    path('api/orders/', api.order_list, name='api_order_list'),
+    path('api/orders/<int:id>/', api.order_detail, name='api_order_detail'),
+    
+    # Order event stream (Server-Sent Events, serve under ASGI)
+    path('events/orders', events.order_events, name='order_events'),
+    
+    # Monitoring
+    path('metrics/', views.metrics_view, name='metrics'),
 ]
\ No newline at end of file
@@ -1,60 +1,89 @@
-import stripe
 from django.conf import settings
 from django.shortcuts import render, get_object_or_404
-from django.http import JsonResponse
-from django.views.decorators.csrf import csrf_exempt
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.http import require_GET, require_POST
+from . import metrics
+from .api import has_bearer_token
+from .checkout_pool import claim_session, item_session_params
+from .idempotency import idempotent
 from .models import Item, Order
+from .query_budget import query_budget
+from .ratelimit import rate_limit
+from .stripe_client import get_stripe
 
-# Initialize Stripe with secret key
-stripe.api_key = settings.STRIPE_SECRET_KEY
 
+def _item_summary(item):
+    """Plain values of an item for templates, so rendering runs no queries"""
+    return {
+        'id': item.id,
+        'name': item.name,
+        'description': item.description,
+        'display_price': item.get_display_price(),
+    }
+
+
+def get_item_context(item):
+    """Fully evaluated context for the item detail page"""
+    return {
+        'item': _item_summary(item),
+        'stripe_public_key': settings.STRIPE_PUBLIC_KEY,
+    }
+
+
+def get_order_context(order):
+    """Fully evaluated context for the order detail page"""
+    totals = order.get_totals()
+    return {
+        'order': {
+            'id': order.id,
+            'discount_code': order.discount.code if order.discount else '',
+            'tax_name': order.tax.name if order.tax else '',
+        },
+        'items': [_item_summary(item) for item in order.items.all()],
+        'subtotal': totals['subtotal'],
+        'discount_amount': totals['discount'],
+        'tax_amount': totals['tax'],
+        'total': totals['total'],
+        'stripe_public_key': settings.STRIPE_PUBLIC_KEY,
+    }
 
+
+@query_budget(1)
 def item_detail(request, id):
     """
     Display item detail page with buy button
     GET /item/{id}
     """
     item = get_object_or_404(Item, id=id)
-    
-    context = {
-        'item': item,
-        'stripe_public_key': settings.STRIPE_PUBLIC_KEY,
-    }
-    
-    return render(request, 'payments/item_detail.html', context)
+    return render(request, 'payments/item_detail.html', get_item_context(item))
 
 
+# Item, then the pool claim (select and conditional update)
+@query_budget(3)
+@require_POST
+@idempotent
+@rate_limit('item')
 def create_checkout_session(request, id):
     """
     Create Stripe Checkout Session for an item
-    GET /buy/{id}
+    POST /buy/{id} with an Idempotency-Key header
     Returns JSON with session ID
     """
     try:
         item = get_object_or_404(Item, id=id)
         
-        # Determine success and cancel URLs
-        domain = request.build_absolute_uri('/')[:-1]  # Remove trailing slash
-        success_url = f"{domain}/success/"
-        cancel_url = f"{domain}/cancel/"
+        # Hand out a pre-created session for hot items when one is ready
+        if settings.CHECKOUT_POOL_ENABLED and item.checkout_pool_size:
+            session_id = claim_session(item)
+            if session_id:
+                return JsonResponse({'id': session_id})
         
         # Create Stripe Checkout Session
+        stripe = get_stripe()
+        domain = request.build_absolute_uri('/')[:-1]  # Remove trailing slash
         session = stripe.checkout.Session.create(
-            payment_method_types=['card'],
-            line_items=[{
-                'price_data': {
-                    'currency': item.currency,
-                    'product_data': {
-                        'name': item.name,
-                        'description': item.description,
-                    },
-                    'unit_amount': item.get_stripe_price(),
-                },
-                'quantity': 1,
-            }],
-            mode='payment',
-            success_url=success_url,
-            cancel_url=cancel_url,
+            **item_session_params(item, domain),
+            idempotency_key=f'item-{item.id}-{request.idempotency_key}',
         )
         
         return JsonResponse({'id': session.id})
@@ -65,39 +94,42 @@ def create_checkout_session(request, id):
         return JsonResponse({'error': str(e)}, status=500)
 
 
+@query_budget(2)
 def order_detail(request, id):
     """
     Display order detail page with buy button
     GET /order/{id}
     """
-    order = get_object_or_404(Order, id=id)
-    
-    context = {
-        'order': order,
-        'items': order.items.all(),
-        'subtotal': order.get_subtotal(),
-        'discount_amount': order.get_discount_amount(),
-        'tax_amount': order.get_tax_amount(),
-        'total': order.get_total(),
-        'stripe_public_key': settings.STRIPE_PUBLIC_KEY,
-    }
-    
-    return render(request, 'payments/order_detail.html', context)
+    order = get_object_or_404(
+        Order.objects.select_related('discount', 'tax').prefetch_related('items'),
+        id=id,
+    )
+    return render(request, 'payments/order_detail.html', get_order_context(order))
 
 
+# Order with discount and tax, its items, then saving the session ID
+@query_budget(3)
+@require_POST
+@idempotent
+@rate_limit('order')
 def create_order_checkout_session(request, id):
     """
     Create Stripe Checkout Session for an order
-    GET /buy/order/{id}
+    POST /buy/order/{id} with an Idempotency-Key header
     Returns JSON with session ID
     """
     try:
-        order = get_object_or_404(Order, id=id)
+        order = get_object_or_404(
+            Order.objects.select_related('discount', 'tax').prefetch_related('items'),
+            id=id,
+        )
+        stripe = get_stripe()
         
         # Determine success and cancel URLs
         domain = request.build_absolute_uri('/')[:-1]
         success_url = f"{domain}/success/"
         cancel_url = f"{domain}/cancel/"
+        idempotency_key = f'order-{order.id}-{request.idempotency_key}'
         
         # Build line items for all items in order
         line_items = []
@@ -133,6 +165,7 @@ def create_order_checkout_session(request, id):
                     currency=order.get_currency(),
                     duration='once',
                     name=order.discount.name,
+                    idempotency_key=f'{idempotency_key}-coupon',
                 )
                 session_params['discounts'] = [{'coupon': coupon.id}]
         
@@ -143,13 +176,17 @@ def create_order_checkout_session(request, id):
                 display_name=order.tax.name,
                 percentage=float(order.tax.rate),
                 inclusive=False,
+                idempotency_key=f'{idempotency_key}-tax-rate',
             )
             # Apply tax to all line items
             for line_item in session_params['line_items']:
                 line_item['tax_rates'] = [tax_rate.id]
         
         # Create session
-        session = stripe.checkout.Session.create(**session_params)
+        session = stripe.checkout.Session.create(
+            **session_params,
+            idempotency_key=idempotency_key,
+        )
         
         # Update order with session ID
         order.stripe_session_id = session.id
@@ -163,17 +200,36 @@ def create_order_checkout_session(request, id):
         return JsonResponse({'error': str(e)}, status=500)
 
 
+@query_budget(0)
 def success(request):
     """Success page after payment"""
     return render(request, 'payments/success.html')
 
 
+@query_budget(0)
 def cancel(request):
     """Cancel page if payment is cancelled"""
     return render(request, 'payments/cancel.html')
 
 
+# Session and user for staff access
+@query_budget(2)
+@require_GET
+def metrics_view(request):
+    """
+    Application metrics in Prometheus text format
+    GET /metrics/ (staff users, or Authorization: Bearer METRICS_TOKEN)
+    """
+    if not (request.user.is_staff or has_bearer_token(request, settings.METRICS_TOKEN)):
+        return HttpResponse(status=403)
+    return HttpResponse(
+        metrics.render_prometheus(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+
+@query_budget(1)
 def home(request):
     """Home page showing all items"""
-    items = Item.objects.all()
+    items = [_item_summary(item) for item in Item.objects.all()]
     return render(request, 'payments/home.html', {'items': items})
\ No newline at end of file